@@ -0,0 +1,166 @@
+import random
+import sys
+import time
+
+from logic import *
+
+# Clause to symbol ratio at which random 3-SAT is hardest
+HARD_RATIO = 4.26
+
+# Worker processes used by model_check_parallel
+PARALLEL_PROCESSES = 2
+
+# Entailment engines being compared, by name
+ENGINES = {
+    "model_check": model_check,
+    "model_check_compiled": model_check_compiled,
+    "model_check_truth_table": model_check_truth_table,
+    "model_check_parallel": lambda knowledge, query:
+        model_check_parallel(knowledge, query, PARALLEL_PROCESSES),
+    "model_count": lambda knowledge, query:
+        count_models(And(knowledge, Not(query))) == 0,
+    "resolution_check": resolution_check
+}
+
+# Engines too slow to run beyond this many symbols
+SYMBOL_LIMITS = {
+    "model_check": 16,
+    "model_check_compiled": 16,
+    "resolution_check": 12
+}
+
+# Largest instances cross-checked against model_check
+CHECK_SYMBOLS = 10
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [instances] [seed]")
+    instances = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    # Make sure all engines agree before timing them
+    mismatches = fuzz(instances * 10, seed)
+    print(f"Cross-checked {instances * 10} small instances: "
+          f"{len(mismatches)} mismatches")
+    for mismatch in mismatches:
+        print(f"  {mismatch}")
+
+    # Time each engine on random CNF and nested formulas
+    print(f"{'workload':<28}" + "".join(f"{name:>26}" for name in ENGINES))
+    rng = random.Random(seed)
+    for n in [8, 12, 16, 20]:
+        workloads = [
+            (f"3-SAT n={n} ratio=2", lambda: random_cnf(n, 2, 3, rng)),
+            (f"3-SAT n={n} ratio={HARD_RATIO}",
+             lambda: random_cnf(n, HARD_RATIO, 3, rng)),
+            (f"nested n={n} depth=4", lambda: random_sentence(n, 4, rng))
+        ]
+        for name, generate in workloads:
+            problems = [(generate(), random_query(n, rng))
+                        for i in range(instances)]
+            timings = benchmark(problems, n)
+            print(f"{name:<28}" + "".join(
+                f"{'-':>26}" if timings[engine] is None
+                else f"{timings[engine] * 1000:>23.3f} ms"
+                for engine in ENGINES
+            ))
+
+
+def symbols(n):
+    """Returns n symbols named x0 to x(n-1)."""
+    return [Symbol(f"x{i}") for i in range(n)]
+
+
+def random_cnf(n, ratio, k, rng):
+    """
+    Returns a random k-CNF sentence over n symbols,
+    with round(n * ratio) clauses of k distinct literals each.
+    """
+    variables = symbols(n)
+    clauses = []
+    for i in range(round(n * ratio)):
+        literals = [
+            symbol if rng.random() < 0.5 else Not(symbol)
+            for symbol in rng.sample(variables, min(k, n))
+        ]
+        clauses.append(Or(*literals))
+    return And(*clauses)
+
+
+def random_sentence(n, depth, rng):
+    """Returns a random nested sentence over n symbols of the given depth."""
+    if depth == 0:
+        return rng.choice(symbols(n))
+    kind = rng.randrange(5)
+    if kind == 0:
+        return Not(random_sentence(n, depth - 1, rng))
+    if kind == 1:
+        return And(*[random_sentence(n, depth - 1, rng)
+                     for i in range(rng.randint(2, 3))])
+    if kind == 2:
+        return Or(*[random_sentence(n, depth - 1, rng)
+                    for i in range(rng.randint(2, 3))])
+    if kind == 3:
+        return Implication(random_sentence(n, depth - 1, rng),
+                           random_sentence(n, depth - 1, rng))
+    return Biconditional(random_sentence(n, depth - 1, rng),
+                         random_sentence(n, depth - 1, rng))
+
+
+def random_query(n, rng, extra=0):
+    """
+    Returns a random query: a literal or a disjunction of two, over
+    n symbols and `extra` more that the knowledge base does not use.
+    """
+    a, b = rng.sample(symbols(n + extra), 2)
+    if rng.random() < 0.5:
+        return a if rng.random() < 0.5 else Not(a)
+    return Or(a, Not(b))
+
+
+def benchmark(problems, n):
+    """
+    Returns the mean time per problem of each engine,
+    or None for engines skipped at this size.
+    """
+    timings = dict()
+    for name, engine in ENGINES.items():
+        if n > SYMBOL_LIMITS.get(name, n):
+            timings[name] = None
+            continue
+        start = time.perf_counter()
+        for knowledge, query in problems:
+            engine(knowledge, query)
+        timings[name] = (time.perf_counter() - start) / len(problems)
+    return timings
+
+
+def fuzz(instances, seed):
+    """
+    Runs every engine on random small instances and returns a description
+    of each disagreement with model_check.
+    """
+    rng = random.Random(seed)
+    mismatches = []
+    for i in range(instances):
+        n = rng.randint(2, CHECK_SYMBOLS)
+        if i % 2:
+            knowledge = random_cnf(n, rng.uniform(1, 6), 3, rng)
+        else:
+            knowledge = random_sentence(n, rng.randint(1, 4), rng)
+        query = random_query(n, rng, extra=rng.choice([0, 0, 2]))
+        expected = model_check(knowledge, query)
+        for name, engine in ENGINES.items():
+            if engine(knowledge, query) != expected:
+                mismatches.append(
+                    f"{name}: {knowledge.formula()} ⊨ {query.formula()} "
+                    f"should be {expected}"
+                )
+    return mismatches
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,52 @@
+import heapq
 import itertools
+import multiprocessing
+import os
+import weakref
 
 
 class Sentence():
+    """
+    Base class for logical sentences.
+
+    Sentences are immutable and hash-consed: constructing a sentence that
+    is structurally equal to a live one returns the existing object, so
+    repeated subformulas are shared, equality is identity, and each
+    sentence computes its hash and symbol set only once.
+    """
+
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    # Maps (class, arguments) to the live sentence with that structure
+    _interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, args, hash_value, symbols, **fields):
+        """
+        Returns the unique sentence of class `cls` built from `args`,
+        creating it with the given hash, symbols and fields if needed.
+        """
+        key = (cls, args)
+        sentence = Sentence._interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for name, value in fields.items():
+                object.__setattr__(sentence, name, value)
+            object.__setattr__(sentence, "_hash", hash_value)
+            object.__setattr__(sentence, "_symbols", frozenset(symbols))
+
+            # Another thread may have interned the same sentence meanwhile
+            sentence = Sentence._interned.setdefault(key, sentence)
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("logical sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("logical sentences are immutable")
+
+    def __hash__(self):
+        return self._hash
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -13,7 +58,16 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return frozenset()
+
+    def truth_table(self, columns, full):
+        """
+        Evaluates the sentence over many models at once.
+        `columns` maps each symbol to a bitset holding one bit per model,
+        `full` has a bit set for every model under consideration.
+        Returns the bitset of models in which the sentence is true.
+        """
+        raise Exception("nothing to evaluate")
 
     @classmethod
     def validate(cls, sentence):
@@ -42,16 +96,48 @@ class Sentence():
             return f"({s})"
 
 
+class Constant(Sentence):
+
+    __slots__ = ("value",)
+
+    def __new__(cls, value):
+        value = bool(value)
+        return cls.intern(
+            (value,), hash(("constant", value)), (), value=value
+        )
+
+    def __reduce__(self):
+        return (Constant, (self.value,))
+
+    def __repr__(self):
+        return f"Constant({self.value})"
+
+    def evaluate(self, model):
+        return self.value
+
+    def formula(self):
+        return "⊤" if self.value else "⊥"
+
+    def symbols(self):
+        return self._symbols
+
+    def truth_table(self, columns, full):
+        return full if self.value else 0
+
+
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    def __new__(cls, name):
+        if not isinstance(name, str):
+            raise TypeError("symbol name must be a string")
+        return cls.intern(
+            (name,), hash(("symbol", name)), (name,), name=name
+        )
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
     def __repr__(self):
         return self.name
@@ -66,19 +152,28 @@ class Symbol(Sentence):
         return self.name
 
     def symbols(self):
-        return {self.name}
+        return self._symbols
+
+    def truth_table(self, columns, full):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
 
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    __slots__ = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls.intern(
+            (operand,), hash(("not", hash(operand))),
+            operand.symbols(), operand=operand
+        )
+
+    def __reduce__(self):
+        return (Not, (self.operand,))
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -90,23 +185,31 @@ class Not(Sentence):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
     def symbols(self):
-        return self.operand.symbols()
+        return self._symbols
+
+    def truth_table(self, columns, full):
+        return full ^ self.operand.truth_table(columns, full)
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
-        for conjunct in conjuncts:
-            Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+    __slots__ = ("conjuncts",)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+    def __new__(cls, *conjuncts):
+        for conjunct in conjuncts:
+            Sentence.validate(conjunct)
+        return cls.intern(
+            conjuncts,
+            hash(("and", tuple(hash(conjunct) for conjunct in conjuncts))),
+            itertools.chain.from_iterable(
+                conjunct.symbols() for conjunct in conjuncts
+            ),
+            conjuncts=conjuncts
         )
 
+    def __reduce__(self):
+        return (And, self.conjuncts)
+
     def __repr__(self):
         conjunctions = ", ".join(
             [str(conjunct) for conjunct in self.conjuncts]
@@ -114,36 +217,57 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError(
+            "conjunctions are immutable, use "
+            "knowledge = knowledge.with_conjunct(conjunct)"
+        )
+
+    def with_conjunct(self, conjunct):
+        """Returns the conjunction extended by `conjunct`."""
+        return And(*self.conjuncts, conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
     def formula(self):
+        if not self.conjuncts:
+            return "⊤"
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return self._symbols
+
+    def truth_table(self, columns, full):
+        result = full
+        for conjunct in self.conjuncts:
+            result &= conjunct.truth_table(columns, full)
+            if not result:
+                break
+        return result
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
-        for disjunct in disjuncts:
-            Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+    __slots__ = ("disjuncts",)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+    def __new__(cls, *disjuncts):
+        for disjunct in disjuncts:
+            Sentence.validate(disjunct)
+        return cls.intern(
+            disjuncts,
+            hash(("or", tuple(hash(disjunct) for disjunct in disjuncts))),
+            itertools.chain.from_iterable(
+                disjunct.symbols() for disjunct in disjuncts
+            ),
+            disjuncts=disjuncts
         )
 
+    def __reduce__(self):
+        return (Or, self.disjuncts)
+
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
@@ -152,29 +276,41 @@ class Or(Sentence):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
     def formula(self):
+        if not self.disjuncts:
+            return "⊥"
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return self._symbols
+
+    def truth_table(self, columns, full):
+        result = 0
+        for disjunct in self.disjuncts:
+            result |= disjunct.truth_table(columns, full)
+            if result == full:
+                break
+        return result
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return cls.intern(
+            (antecedent, consequent),
+            hash(("implies", hash(antecedent), hash(consequent))),
+            antecedent.symbols() | consequent.symbols(),
+            antecedent=antecedent, consequent=consequent
+        )
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -189,23 +325,30 @@ class Implication(Sentence):
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        return self._symbols
+
+    def truth_table(self, columns, full):
+        antecedent = self.antecedent.truth_table(columns, full)
+        consequent = self.consequent.truth_table(columns, full)
+        return (full ^ antecedent) | consequent
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return cls.intern(
+            (left, right),
+            hash(("biconditional", hash(left), hash(right))),
+            left.symbols() | right.symbols(),
+            left=left, right=right
+        )
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -217,12 +360,17 @@ class Biconditional(Sentence):
                     and not self.right.evaluate(model)))
 
     def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
+        left = Sentence.parenthesize(self.left.formula())
+        right = Sentence.parenthesize(self.right.formula())
         return f"{left} <=> {right}"
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+        return self._symbols
+
+    def truth_table(self, columns, full):
+        left = self.left.truth_table(columns, full)
+        right = self.right.truth_table(columns, full)
+        return full ^ (left ^ right)
 
 
 def model_check(knowledge, query):
@@ -257,7 +405,876 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def simplify(sentence, facts=None):
+    """
+    Rewrites a sentence into a smaller one with the same models.
+
+    Nested conjunctions and disjunctions are flattened, constants folded,
+    double negations removed, and duplicate or tautological operands
+    dropped. Literals asserted at the top level are propagated into the
+    rest of the sentence until no new ones appear. `facts` maps symbols
+    to values known to hold; those symbols are substituted away, so the
+    result only agrees with the sentence in models consistent with them.
+
+    Returns the simplified sentence and a dictionary reporting its size
+    before and after.
+    """
+    facts = dict(facts or {})
+    report = {
+        "nodes_before": sentence_size(sentence),
+        "symbols_before": len(sentence.symbols()),
+        "units": 0
+    }
+    result = _simplify(sentence, facts, dict())
+
+    # Propagate top-level literals into the remaining conjuncts
+    units = dict()
+    while True:
+        conjuncts = result.conjuncts if isinstance(result, And) else (result,)
+        found = dict(filter(None, map(_literal, conjuncts)))
+        if found.keys() <= units.keys():
+            break
+        units.update(found)
+        known = {**facts, **units}
+        memo = dict()
+        result = _simplify(And(*[
+            conjunct if _literal(conjunct)
+            else _simplify(conjunct, known, memo)
+            for conjunct in conjuncts
+        ]), facts, dict())
+
+    report["nodes_after"] = sentence_size(result)
+    report["symbols_after"] = len(result.symbols())
+    report["units"] = len(units)
+    return result, report
+
+
+def sentence_size(sentence):
+    """Returns the number of nodes in the sentence written out as a tree."""
+    if isinstance(sentence, (Symbol, Constant)):
+        return 1
+    if isinstance(sentence, Not):
+        return 1 + sentence_size(sentence.operand)
+    if isinstance(sentence, And):
+        return 1 + sum(sentence_size(c) for c in sentence.conjuncts)
+    if isinstance(sentence, Or):
+        return 1 + sum(sentence_size(d) for d in sentence.disjuncts)
+    if isinstance(sentence, Implication):
+        return (1 + sentence_size(sentence.antecedent)
+                + sentence_size(sentence.consequent))
+    return 1 + sentence_size(sentence.left) + sentence_size(sentence.right)
+
+
+def _literal(sentence):
+    """Returns (symbol, value) if sentence is a literal, None otherwise."""
+    if isinstance(sentence, Symbol):
+        return sentence.name, True
+    if isinstance(sentence, Not) and isinstance(sentence.operand, Symbol):
+        return sentence.operand.name, False
+    return None
+
+
+def _negate(sentence):
+    """Returns the negation of a sentence without double negation."""
+    if isinstance(sentence, Constant):
+        return Constant(not sentence.value)
+    if isinstance(sentence, Not):
+        return sentence.operand
+    return Not(sentence)
+
+
+def _simplify(sentence, facts, memo):
+    """Simplifies a sentence given fixed symbol values, memoized per node."""
+    if sentence in memo:
+        return memo[sentence]
+    TRUE, FALSE = Constant(True), Constant(False)
+
+    if isinstance(sentence, Constant):
+        result = sentence
+
+    elif isinstance(sentence, Symbol):
+        if sentence.name in facts:
+            result = Constant(facts[sentence.name])
+        else:
+            result = sentence
+
+    elif isinstance(sentence, Not):
+        result = _negate(_simplify(sentence.operand, facts, memo))
+
+    elif isinstance(sentence, (And, Or)):
+        conjunction = isinstance(sentence, And)
+        kind = And if conjunction else Or
+        operands = sentence.conjuncts if conjunction else sentence.disjuncts
+        identity, absorbing = (TRUE, FALSE) if conjunction else (FALSE, TRUE)
+
+        # Flatten, drop identities and duplicates, keeping operand order
+        flat = dict()
+        pending = [_simplify(operand, facts, memo)
+                   for operand in reversed(operands)]
+        while pending:
+            operand = pending.pop()
+            if isinstance(operand, kind):
+                pending.extend(reversed(operand.conjuncts if conjunction
+                                        else operand.disjuncts))
+            elif operand is not identity:
+                flat[operand] = None
+
+        # An absorbing constant or a complementary pair decides the result
+        if absorbing in flat or any(_negate(operand) in flat
+                                    for operand in flat):
+            result = absorbing
+        elif not flat:
+            result = identity
+        elif len(flat) == 1:
+            result = next(iter(flat))
+        else:
+            result = kind(*flat)
+
+    elif isinstance(sentence, Implication):
+        antecedent = _simplify(sentence.antecedent, facts, memo)
+        consequent = _simplify(sentence.consequent, facts, memo)
+        if (antecedent is FALSE or consequent is TRUE
+                or antecedent is consequent):
+            result = TRUE
+        elif antecedent is TRUE:
+            result = consequent
+        elif consequent is FALSE:
+            result = _negate(antecedent)
+        else:
+            result = Implication(antecedent, consequent)
+
+    else:
+        left = _simplify(sentence.left, facts, memo)
+        right = _simplify(sentence.right, facts, memo)
+        if left is right:
+            result = TRUE
+        elif left is _negate(right):
+            result = FALSE
+        elif isinstance(left, Constant):
+            result = right if left.value else _negate(right)
+        elif isinstance(right, Constant):
+            result = left if right.value else _negate(left)
+        else:
+            result = Biconditional(left, right)
+
+    memo[sentence] = result
+    return result
+
+
+def to_cnf(sentence, variables=None):
+    """
+    Converts a sentence into clauses using the Tseitin transformation.
+
+    Each clause is a frozenset of nonzero integer literals, where -v is
+    the negation of variable v. `variables` maps symbol names to variable
+    numbers and is extended with any missing symbols; compound
+    subformulas get helper variables numbered after every variable in
+    it, recorded under keys ("helper", number) so that later conversions
+    sharing `variables` never reuse them. Every model of the sentence
+    extends to exactly one model of the clauses, so model counts are
+    preserved.
+
+    Returns the set of clauses and the symbol-to-variable mapping.
+    """
+    variables = dict() if variables is None else variables
+    for name in sorted(sentence.symbols()):
+        if name not in variables:
+            variables[name] = max(variables.values(), default=0) + 1
+    counter = itertools.count(max(variables.values(), default=0) + 1)
+    clauses = set()
+    literals = dict()
+
+    def define(*definition):
+        """Adds clauses, skipping tautologies."""
+        for clause in definition:
+            clause = frozenset(clause)
+            if not any(-l in clause for l in clause):
+                clauses.add(clause)
+
+    def encode(s):
+        """Returns a literal equivalent to sentence s."""
+        if s in literals:
+            return literals[s]
+        if isinstance(s, Symbol):
+            literal = variables[s.name]
+        elif isinstance(s, Not):
+            literal = -encode(s.operand)
+        else:
+            literal = next(counter)
+            variables[("helper", literal)] = literal
+            if isinstance(s, Constant):
+                define([literal if s.value else -literal])
+            elif isinstance(s, (And, Or)):
+                conjunction = isinstance(s, And)
+                operands = [encode(operand) for operand in
+                            (s.conjuncts if conjunction else s.disjuncts)]
+                sign = 1 if conjunction else -1
+                define(*[[-sign * literal, sign * operand]
+                                  for operand in operands])
+                define([sign * literal]
+                       + [-sign * operand for operand in operands])
+            elif isinstance(s, Implication):
+                a, c = encode(s.antecedent), encode(s.consequent)
+                define([-literal, -a, c], [literal, a], [literal, -c])
+            else:
+                a, b = encode(s.left), encode(s.right)
+                define([-literal, -a, b], [-literal, a, -b],
+                       [literal, a, b], [literal, -a, -b])
+        literals[s] = literal
+        return literal
+
+    # Assert top-level conjuncts and disjunctions directly
+    pending = [sentence]
+    while pending:
+        s = pending.pop()
+        if isinstance(s, And):
+            pending.extend(s.conjuncts)
+        elif isinstance(s, Or):
+            define([encode(disjunct) for disjunct in s.disjuncts])
+        else:
+            define([encode(s)])
+
+    return clauses, variables
+
+
+def count_models(knowledge, symbols=None):
+    """
+    Returns the number of models of the knowledge base over its symbols
+    together with any additional `symbols`.
+    """
+    total, _ = model_counts(knowledge, symbols)
+    return total
+
+
+def model_counts(knowledge, symbols=None):
+    """
+    Counts the models of the knowledge base over its symbols together
+    with any additional `symbols`.
+
+    Returns the total number of models and a dictionary mapping each
+    symbol to the number of models in which it is true; dividing the two
+    gives the probability of the symbol under a uniform prior.
+    """
+    names = set(knowledge.symbols()).union(symbols or ())
+    variables = {name: i + 1 for i, name in enumerate(sorted(names))}
+    clauses, variables = to_cnf(knowledge, variables)
+    total, counts = _count(
+        frozenset(clauses),
+        _variables(clauses) | set(variables.values()),
+        dict()
+    )
+    return total, {name: counts.get(variables[name], 0) for name in names}
+
+
+def _variables(clauses):
+    """Returns the set of variables occurring in clauses."""
+    return {abs(literal) for clause in clauses for literal in clause}
+
+
+def _condition(clauses, literal):
+    """
+    Returns clauses simplified by making `literal` true,
+    or None if that falsifies one of them.
+    """
+    result = set()
+    for clause in clauses:
+        if literal in clause:
+            continue
+        if -literal in clause:
+            clause = clause - {-literal}
+            if not clause:
+                return None
+        result.add(clause)
+    return frozenset(result)
+
+
+def _propagate(clauses):
+    """
+    Applies unit propagation to clauses.
+    Returns the remaining clauses and the forced variable values,
+    or (None, None) if a conflict is found.
+    """
+    assigned = dict()
+    if frozenset() in clauses:
+        return None, None
+    while True:
+        unit = next((clause for clause in clauses if len(clause) == 1), None)
+        if unit is None:
+            return clauses, assigned
+        literal, = unit
+        assigned[abs(literal)] = literal > 0
+        clauses = _condition(clauses, literal)
+        if clauses is None:
+            return None, None
+
+
+def _components(clauses):
+    """Splits clauses into groups that share no variables."""
+    occurrences = dict()
+    for clause in clauses:
+        for literal in clause:
+            occurrences.setdefault(abs(literal), []).append(clause)
+
+    groups = []
+    seen = set()
+    for v in occurrences:
+        if v in seen:
+            continue
+        seen.add(v)
+        group = set()
+        frontier = [v]
+        while frontier:
+            for clause in occurrences[frontier.pop()]:
+                if clause in group:
+                    continue
+                group.add(clause)
+                for literal in clause:
+                    if abs(literal) not in seen:
+                        seen.add(abs(literal))
+                        frontier.append(abs(literal))
+        groups.append(frozenset(group))
+    return groups
+
+
+def _count(clauses, variables, cache):
+    """
+    Counts models of clauses over `variables`, which must include every
+    variable in the clauses, along with the number of those models in
+    which each variable is true.
+    """
+    clauses, assigned = _propagate(clauses)
+    if clauses is None:
+        return 0, dict()
+
+    # Count independent components separately and multiply
+    total = 1
+    parts = []
+    for component in _components(clauses):
+        count, counts = _count_component(component, cache)
+        if not count:
+            return 0, dict()
+        total *= count
+        parts.append((count, counts))
+
+    # Variables no longer constrained may take either value
+    free = variables - assigned.keys() - _variables(clauses)
+    total <<= len(free)
+
+    counts = dict()
+    for count, part in parts:
+        scale = total // count
+        for v, c in part.items():
+            counts[v] = c * scale
+    for v, value in assigned.items():
+        counts[v] = total if value else 0
+    for v in free:
+        counts[v] = total >> 1
+    return total, counts
+
+
+def _count_component(component, cache):
+    """Counts models of a connected component by branching, with caching."""
+    if component in cache:
+        return cache[component]
+
+    # Branch on the most frequently occurring variable
+    occurrences = dict()
+    for clause in component:
+        for literal in clause:
+            occurrences[abs(literal)] = occurrences.get(abs(literal), 0) + 1
+    v = max(occurrences, key=occurrences.get)
+    rest = occurrences.keys() - {v}
+
+    total = 0
+    counts = {v: 0}
+    for literal in (v, -v):
+        conditioned = _condition(component, literal)
+        if conditioned is None:
+            continue
+        count, part = _count(conditioned, rest, cache)
+        total += count
+        for var, c in part.items():
+            counts[var] = counts.get(var, 0) + c
+        if literal > 0:
+            counts[v] += count
+
+    cache[component] = (total, counts)
+    return total, counts
+
+
+# Largest clause set built by distribution before falling back to Tseitin
+CLAUSE_LIMIT = 4096
+
+
+def to_clauses(sentence, variables):
+    """
+    Converts a sentence into an equivalent set of clauses by pushing
+    negations inward and distributing disjunction over conjunction.
+    Clauses use the integer literals of `variables`, which is extended
+    with any missing symbols. Falls back to to_cnf() if the result would
+    exceed CLAUSE_LIMIT clauses.
+    """
+    for name in sorted(sentence.symbols()):
+        if name not in variables:
+            variables[name] = max(variables.values(), default=0) + 1
+    try:
+        return _distribute(sentence, True, variables, dict())
+    except OverflowError:
+        clauses, _ = to_cnf(sentence, variables)
+        return clauses
+
+
+def _distribute(sentence, positive, variables, memo):
+    """Returns the clauses of sentence, or of its negation if not positive."""
+    key = (sentence, positive)
+    if key in memo:
+        return memo[key]
+
+    if isinstance(sentence, Constant):
+        clauses = set() if sentence.value == positive else {frozenset()}
+    elif isinstance(sentence, Symbol):
+        literal = variables[sentence.name]
+        clauses = {frozenset([literal if positive else -literal])}
+    elif isinstance(sentence, Not):
+        clauses = _distribute(sentence.operand, not positive, variables, memo)
+    else:
+        if isinstance(sentence, And):
+            conjunction, parts = positive, [
+                (conjunct, positive) for conjunct in sentence.conjuncts
+            ]
+        elif isinstance(sentence, Or):
+            conjunction, parts = not positive, [
+                (disjunct, positive) for disjunct in sentence.disjuncts
+            ]
+        elif isinstance(sentence, Implication):
+            conjunction, parts = not positive, [
+                (sentence.antecedent, not positive),
+                (sentence.consequent, positive)
+            ]
+        else:
+            left, right = sentence.left, sentence.right
+            conjunction, parts = True, [
+                (Or(Not(left), right), positive),
+                (Or(left, Not(right)), positive)
+            ] if positive else [(Or(left, right), True),
+                                (Or(Not(left), Not(right)), True)]
+
+        if conjunction:
+            clauses = set()
+            for part, sign in parts:
+                clauses |= _distribute(part, sign, variables, memo)
+        else:
+            clauses = {frozenset()}
+            for part, sign in parts:
+                clauses = {
+                    a | b
+                    for a in clauses
+                    for b in _distribute(part, sign, variables, memo)
+                    if not any(-literal in a for literal in b)
+                }
+                if len(clauses) > CLAUSE_LIMIT:
+                    raise OverflowError("clause set too large")
+
+    memo[key] = clauses
+    return clauses
+
+
+# Most resolvents derived by one refutation before giving up on it
+RESOLVENT_LIMIT = 20000
+
+
+def resolution_check(knowledge, query):
+    """
+    Checks if knowledge base entails query using resolution refutation,
+    or by DPLL search if the refutation exceeds RESOLVENT_LIMIT.
+    """
+    try:
+        return _refute(knowledge, query)[0]
+    except OverflowError:
+        premises, variables, consistent = _premises(knowledge)
+        variables = dict(variables)
+        negation = to_clauses(Not(query), variables)
+        return not _satisfiable(premises | negation)
+
+
+def resolution_proof(knowledge, query):
+    """
+    Returns the steps of a resolution refutation showing that
+    knowledge base entails query, or None if it does not.
+    Raises OverflowError if the refutation exceeds RESOLVENT_LIMIT.
+    """
+    entailed, parents, names = _refute(knowledge, query)
+    if not entailed:
+        return None
+
+    # Number the clauses used to derive the empty clause, premises first
+    order = []
+    numbers = dict()
+
+    def visit(clause):
+        if clause in numbers:
+            return
+        if isinstance(parents[clause], tuple):
+            for parent in parents[clause]:
+                visit(parent)
+        numbers[clause] = len(order) + 1
+        order.append(clause)
+
+    visit(frozenset())
+
+    steps = []
+    for clause in order:
+        source = parents[clause]
+        if isinstance(source, tuple):
+            source = "resolve " + ", ".join(
+                str(numbers[parent]) for parent in source
+            )
+        steps.append(f"{numbers[clause]}. {_clause_formula(clause, names)}"
+                     f"    [{source}]")
+    return steps
+
+
+def _clause_formula(clause, names):
+    """Returns a clause written as a disjunction of literals."""
+    if not clause:
+        return "⊥"
+    return " ∨ ".join(
+        ("¬" if literal < 0 else "")
+        + Sentence.parenthesize(names.get(abs(literal), f"_{abs(literal)}"))
+        for literal in sorted(clause, key=abs)
+    )
+
+
+def _refute(knowledge, query):
+    """
+    Tries to derive the empty clause from the knowledge base and the
+    negated query, using the negated query as the set of support.
+    Returns whether the query is entailed, the origin of each clause
+    (a label or a pair of parent clauses) and the names of variables.
+    """
+    premises, variables, consistent = _premises(knowledge)
+    variables = dict(variables)
+    negation = to_clauses(Not(query), variables)
+    names = {v: name for name, v in variables.items()
+             if isinstance(name, str)}
+
+    parents = dict()
+    for clause in premises:
+        parents[clause] = "knowledge"
+    for clause in negation:
+        parents.setdefault(clause, "negated query")
+
+    if _saturate(set(premises), negation - premises, parents):
+        return True, parents, names
+
+    # Set of support is only complete for a consistent knowledge base,
+    # an inconsistent one is refuted by resolving among its own clauses
+    if not consistent:
+        return _saturate(set(), premises, parents), parents, names
+    return False, parents, names
+
+
+# Clauses of knowledge bases already converted, reused across queries
+_premise_cache = weakref.WeakKeyDictionary()
+
+
+def _premises(knowledge):
+    """
+    Returns the clauses of a knowledge base, the variables they use,
+    and whether the knowledge base is consistent.
+    """
+    if knowledge not in _premise_cache:
+        variables = dict()
+        clauses = frozenset(to_clauses(knowledge, variables))
+        _premise_cache[knowledge] = (
+            clauses, variables, _satisfiable(clauses)
+        )
+    return _premise_cache[knowledge]
+
+
+def _satisfiable(clauses):
+    """Checks if clauses have a model, by DPLL search."""
+    clauses, _ = _propagate(clauses)
+    if clauses is None:
+        return False
+    if not clauses:
+        return True
+    literal = next(iter(min(clauses, key=len)))
+    return any(
+        branch is not None and _satisfiable(branch)
+        for branch in (_condition(clauses, literal),
+                       _condition(clauses, -literal))
+    )
+
+
+def _saturate(usable, support, parents):
+    """
+    Resolves clauses from the set of support against all processed
+    clauses, shortest first, until the empty clause is derived (returns
+    True) or no new clauses can be produced (returns False). Clauses
+    subsumed by others are discarded. `parents` records new resolvents.
+    Raises OverflowError after RESOLVENT_LIMIT resolvents.
+    """
+    if frozenset() in usable or frozenset() in support:
+        return True
+
+    # Processed clauses, indexed by the literals they contain
+    index = dict()
+    processed = set()
+
+    def subsumed(clause):
+        """Checks if a processed clause is a subset of clause."""
+        return any(
+            other <= clause
+            for literal in clause
+            for other in index.get(literal, ())
+        )
+
+    def process(clause):
+        """Adds clause to the processed set, removing clauses it subsumes."""
+        literals = iter(clause)
+        candidates = set(index.get(next(literals), ()))
+        for literal in literals:
+            candidates &= index.get(literal, set())
+        for other in candidates:
+            processed.discard(other)
+            for literal in other:
+                index[literal].discard(other)
+        processed.add(clause)
+        for literal in clause:
+            index.setdefault(literal, set()).add(clause)
+
+    for clause in sorted(usable, key=len):
+        if not _tautology(clause) and not subsumed(clause):
+            process(clause)
+
+    # Priority queue of clauses waiting to be processed
+    queue = [(len(clause), i, clause) for i, clause in enumerate(support)]
+    heapq.heapify(queue)
+    seen = set(support)
+    counter = itertools.count(len(queue))
+
+    while queue:
+        _, _, given = heapq.heappop(queue)
+        if given not in processed and (_tautology(given) or subsumed(given)):
+            continue
+
+        # Resolve on each literal against clauses containing its negation
+        for literal in given:
+            for other in list(index.get(-literal, ())):
+                resolvent = (given - {literal}) | (other - {-literal})
+                if resolvent in seen or _tautology(resolvent):
+                    continue
+                seen.add(resolvent)
+                parents.setdefault(resolvent, (given, other))
+                if not resolvent:
+                    return True
+                if len(seen) > RESOLVENT_LIMIT:
+                    raise OverflowError("too many resolvents")
+                if not subsumed(resolvent):
+                    heapq.heappush(
+                        queue, (len(resolvent), next(counter), resolvent)
+                    )
+
+        if given not in processed:
+            process(given)
+
+    return False
+
+
+def _tautology(clause):
+    """Checks if a clause contains a literal and its negation."""
+    return any(-literal in clause for literal in clause)
+
+
+# Number of symbols evaluated side by side in one truth table block
+BLOCK_SYMBOLS = 16
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Compiles a sentence into a function of a bit-packed model, returning
+    1 if the sentence holds and 0 otherwise. Symbol `symbols[i]` is read
+    from bit i of the integer passed in.
+
+    The function computes one local variable per distinct subformula,
+    children before parents, so its code stays flat however deeply the
+    sentence is nested, and shared subformulas are computed once.
+    """
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    names = dict()
+    lines = ["def check(m):"]
+
+    # Visit subformulas in post-order without recursing
+    stack = [(sentence, False)]
+    while stack:
+        s, expanded = stack.pop()
+        if s in names:
+            continue
+        if isinstance(s, Not):
+            operands = [s.operand]
+        elif isinstance(s, And):
+            operands = list(s.conjuncts)
+        elif isinstance(s, Or):
+            operands = list(s.disjuncts)
+        elif isinstance(s, Implication):
+            operands = [s.antecedent, s.consequent]
+        elif isinstance(s, Biconditional):
+            operands = [s.left, s.right]
+        else:
+            operands = []
+        if not expanded and any(o not in names for o in operands):
+            stack.append((s, True))
+            stack.extend((o, False) for o in reversed(operands))
+            continue
+
+        values = [names[o] for o in operands]
+        if isinstance(s, Constant):
+            expression = "1" if s.value else "0"
+        elif isinstance(s, Symbol):
+            expression = f"m >> {index[s.name]} & 1"
+        elif isinstance(s, Not):
+            expression = f"{values[0]} ^ 1"
+        elif isinstance(s, And):
+            expression = " & ".join(values) or "1"
+        elif isinstance(s, Or):
+            expression = " | ".join(values) or "0"
+        elif isinstance(s, Implication):
+            expression = f"{values[0]} ^ 1 | {values[1]}"
+        else:
+            expression = f"{values[0]} ^ {values[1]} ^ 1"
+        names[s] = f"v{len(names)}"
+        lines.append(f"    {names[s]} = {expression}")
+
+    lines.append(f"    return {names[sentence]}")
+    namespace = dict()
+    exec(compile("\n".join(lines), "<sentence>", "exec"), namespace)
+    return namespace["check"]
+
+
+def model_check_compiled(knowledge, query):
+    """
+    Checks if knowledge base entails query by running a compiled check
+    on every bit-packed model.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    counterexample = compile_sentence(And(knowledge, Not(query)), symbols)
+    return not any(map(counterexample, range(1 << len(symbols))))
+
+
+def symbol_columns(symbols):
+    """
+    Returns bitsets over all 2^n models of `symbols`, one per symbol.
+    Bit m of the bitset for `symbols[i]` is set if bit i of m is set.
+    """
+    columns = dict()
+    total = 1 << len(symbols)
+    for i, symbol in enumerate(symbols):
+        block = 1 << i
+        column = ((1 << block) - 1) << block
+        width = 2 * block
+        while width < total:
+            column |= column << width
+            width *= 2
+        columns[symbol] = column
+    return columns
+
+
+def truth_table(sentence, symbols):
+    """
+    Returns a bitset with bit m set if sentence is true in model m,
+    where model m assigns `symbols[i]` the value of bit i of m.
+    """
+    full = (1 << (1 << len(symbols))) - 1
+    return sentence.truth_table(symbol_columns(symbols), full)
+
+
+def model_check_truth_table(knowledge, query):
+    """
+    Checks if knowledge base entails query, evaluating whole
+    blocks of models at a time as bitsets.
+    """
+
+    # Get all symbols in both knowledge and query
+    symbols = sorted(knowledge.symbols() | query.symbols())
+
+    return _check_blocks(knowledge, query, symbols, dict())
+
+
+def _check_blocks(knowledge, query, symbols, fixed):
+    """
+    Checks if knowledge base entails query in every model assigning
+    `symbols` freely and other symbols the values given by `fixed`.
+    """
+
+    # Models of the first symbols are evaluated side by side, the
+    # remaining symbols are fixed to one value per block
+    inner, outer = symbols[:BLOCK_SYMBOLS], symbols[BLOCK_SYMBOLS:]
+    columns = symbol_columns(inner)
+    full = (1 << (1 << len(inner))) - 1
+    for symbol, value in fixed.items():
+        columns[symbol] = full if value else 0
+
+    for assignment in range(1 << len(outer)):
+        for i, symbol in enumerate(outer):
+            columns[symbol] = full if assignment >> i & 1 else 0
+
+        # Look for a model where knowledge holds but query does not
+        models = knowledge.truth_table(columns, full)
+        if models and models & ~query.truth_table(columns, full):
+            return False
+
+    return True
+
+
+def model_check_parallel(knowledge, query, processes=None, split=None):
+    """
+    Checks if knowledge base entails query using worker processes.
+
+    The models are divided into parts by fixing the values of the first
+    `split` symbols, and each part is checked by a worker. All workers
+    are stopped as soon as one finds a model of the knowledge base in
+    which the query is false.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    processes = processes or os.cpu_count() or 1
+
+    # A few parts per process keeps every worker busy until the end
+    if split is None:
+        split = (4 * processes - 1).bit_length()
+    split = min(split, len(symbols))
+    fixed, free = symbols[:split], symbols[split:]
+    parts = (
+        dict(zip(fixed, values))
+        for values in itertools.product((True, False), repeat=split)
+    )
+
+    with multiprocessing.Pool(processes, initializer=_init_part,
+                              initargs=(knowledge, query, free)) as pool:
+        for entailed in pool.imap_unordered(_check_part, parts):
+            if not entailed:
+                # Leaving the pool terminates the remaining workers
+                return False
+    return True
+
+
+# Knowledge base, query and free symbols shared by a worker's parts
+_part_problem = None
+
+
+def _init_part(knowledge, query, symbols):
+    """Stores the problem being checked in a worker process."""
+    global _part_problem
+    _part_problem = (knowledge, query, symbols)
+
+
+def _check_part(fixed):
+    """Checks entailment in the part of the models given by `fixed`."""
+    knowledge, query, symbols = _part_problem
+    return _check_blocks(knowledge, query, symbols, fixed)
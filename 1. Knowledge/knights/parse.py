@@ -0,0 +1,114 @@
+import re
+
+from logic import *
+
+# Operator spellings, in the symbolic form printed by Sentence.formula()
+# and in an ASCII form
+NOT = {"¬", "~", "!"}
+AND = {"∧", "&"}
+OR = {"∨", "|"}
+IMPLIES = {"=>", "->"}
+IFF = {"<=>", "<->"}
+CONSTANTS = {"⊤": True, "⊥": False}
+
+# Symbol names run up to the next operator or parenthesis, and may not
+# contain the <, =, > and - of arrows, so that a stray one is an error
+TOKENS = re.compile(r"""
+    \s*(
+        <=> | <-> | => | ->
+      | [¬~!∧&∨|()⊤⊥]
+      | [^¬~!∧&∨|()⊤⊥<=>-]+
+    )
+""", re.VERBOSE)
+
+
+def tokenize(text):
+    """Returns the list of tokens in a formula."""
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKENS.match(text, position)
+        if match is None:
+            raise ValueError(f"cannot parse formula at: {text[position:]}")
+        tokens.append(match.group(1).strip())
+        position = match.end()
+    return tokens
+
+
+def parse(text):
+    """
+    Parses a formula, in the syntax printed by Sentence.formula()
+    or its ASCII equivalent, into a logical sentence.
+
+    From loosest to tightest binding the operators are <=>, =>, ∨, ∧
+    and ¬; <=> and => group to the right.
+    """
+    tokens = tokenize(text)
+    sentence, position = _biconditional(tokens, 0)
+    if position != len(tokens):
+        raise ValueError(f"unexpected {tokens[position]!r} in formula")
+    return sentence
+
+
+def _biconditional(tokens, position):
+    left, position = _implication(tokens, position)
+    if position < len(tokens) and tokens[position] in IFF:
+        right, position = _biconditional(tokens, position + 1)
+        return Biconditional(left, right), position
+    return left, position
+
+
+def _implication(tokens, position):
+    antecedent, position = _disjunction(tokens, position)
+    if position < len(tokens) and tokens[position] in IMPLIES:
+        consequent, position = _implication(tokens, position + 1)
+        return Implication(antecedent, consequent), position
+    return antecedent, position
+
+
+def _disjunction(tokens, position):
+    disjuncts = []
+    while True:
+        disjunct, position = _conjunction(tokens, position)
+        disjuncts.append(disjunct)
+        if position < len(tokens) and tokens[position] in OR:
+            position += 1
+        else:
+            break
+    if len(disjuncts) == 1:
+        return disjuncts[0], position
+    return Or(*disjuncts), position
+
+
+def _conjunction(tokens, position):
+    conjuncts = []
+    while True:
+        conjunct, position = _negation(tokens, position)
+        conjuncts.append(conjunct)
+        if position < len(tokens) and tokens[position] in AND:
+            position += 1
+        else:
+            break
+    if len(conjuncts) == 1:
+        return conjuncts[0], position
+    return And(*conjuncts), position
+
+
+def _negation(tokens, position):
+    if position >= len(tokens):
+        raise ValueError("formula ended unexpectedly")
+    token = tokens[position]
+    if token in NOT:
+        operand, position = _negation(tokens, position + 1)
+        return Not(operand), position
+    if token == "(":
+        sentence, position = _biconditional(tokens, position + 1)
+        if position >= len(tokens) or tokens[position] != ")":
+            raise ValueError("missing closing parenthesis in formula")
+        return sentence, position + 1
+    if token in CONSTANTS:
+        return Constant(CONSTANTS[token]), position + 1
+    if token == ")" or token in AND | OR | IMPLIES | IFF:
+        raise ValueError(f"unexpected {token!r} in formula")
+    return Symbol(token), position + 1
@@ -0,0 +1,116 @@
+import collections
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+from logic import *
+from parse import parse
+
+# Puzzles queued for each worker process at most, which bounds memory
+# however large the input is
+QUEUED_PER_PROCESS = 64
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python solve.py puzzles.jsonl [processes]")
+    filename = sys.argv[1]
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else os.cpu_count()
+
+    # Solve puzzles as they are read, writing one result per line
+    latencies = []
+    start = time.perf_counter()
+    with open(filename, encoding="utf-8") as f, \
+            multiprocessing.Pool(processes) as pool:
+        lines = (line for line in f if line.strip())
+        for result in run(pool, lines, processes * QUEUED_PER_PROCESS):
+            latencies.append(result["seconds"])
+            print(json.dumps(result, ensure_ascii=False))
+    elapsed = time.perf_counter() - start
+
+    # Report throughput and per-puzzle latency
+    report = summarize(latencies, elapsed)
+    print(json.dumps(report), file=sys.stderr)
+
+
+def run(pool, lines, limit):
+    """
+    Submits a puzzle for each of `lines` to `pool`, keeping at most
+    `limit` unfinished at a time, and yields their results in order.
+    """
+    pending = collections.deque()
+    for line in lines:
+        pending.append(pool.apply_async(solve_line, (line,)))
+        if len(pending) >= limit:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def solve_line(line):
+    """
+    Solves one puzzle given as a JSON object with fields:
+        "id": identifier copied to the result,
+        "knowledge": formula of the knowledge base,
+        "queries": optional list of symbols to check, defaulting to
+                   every symbol in the knowledge base.
+    Returns the id, the entailed queries and the time taken, or the id
+    and an error if the puzzle can't be read or solved.
+    """
+    start = time.perf_counter()
+    puzzle = None
+    try:
+        puzzle = json.loads(line)
+        knowledge = parse(puzzle["knowledge"])
+        queries = puzzle.get("queries") or sorted(knowledge.symbols())
+        entailed = solve(knowledge, queries)
+    except Exception as error:
+        return {
+            "id": puzzle.get("id") if isinstance(puzzle, dict) else None,
+            "error": f"{type(error).__name__}: {error}",
+            "seconds": time.perf_counter() - start
+        }
+    return {
+        "id": puzzle.get("id"),
+        "entailed": entailed,
+        "seconds": time.perf_counter() - start
+    }
+
+
+def solve(knowledge, queries):
+    """Returns the symbols in `queries` entailed by the knowledge base."""
+    symbols = sorted(knowledge.symbols().union(queries))
+
+    # Small puzzles evaluate the knowledge base once for every query
+    if len(symbols) > BLOCK_SYMBOLS:
+        return [query for query in queries
+                if model_check_truth_table(knowledge, Symbol(query))]
+    columns = symbol_columns(symbols)
+    full = (1 << (1 << len(symbols))) - 1
+    models = knowledge.truth_table(columns, full)
+    return [query for query in queries if not models & ~columns[query]]
+
+
+def summarize(latencies, elapsed):
+    """Returns throughput and latency statistics for a batch of puzzles."""
+    if not latencies:
+        return {"puzzles": 0, "seconds": elapsed}
+    latencies = sorted(latencies)
+    return {
+        "puzzles": len(latencies),
+        "seconds": elapsed,
+        "puzzles_per_second": len(latencies) / elapsed,
+        "latency_mean": statistics.fmean(latencies),
+        "latency_p50": latencies[len(latencies) // 2],
+        "latency_p95": latencies[int(len(latencies) * 0.95)],
+        "latency_max": latencies[-1]
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import random
+import weakref
+
+import pytest
+
+import logic
+from benchmark import random_cnf, random_query, random_sentence, symbols
+from logic import *
+
+
+def test_simplify_preserves_models():
+    rng = random.Random(0)
+    for i in range(300):
+        sentence = random_sentence(rng.randint(1, 6), rng.randint(1, 4), rng)
+        simplified, report = simplify(sentence)
+        symbols = sorted(sentence.symbols())
+        assert simplified.symbols() <= sentence.symbols()
+        assert (truth_table(simplified, symbols)
+                == truth_table(sentence, symbols))
+        assert report["nodes_after"] == sentence_size(simplified)
+
+
+def test_simplify_with_facts_preserves_consistent_models():
+    rng = random.Random(1)
+    for i in range(300):
+        sentence = random_sentence(rng.randint(2, 6), rng.randint(1, 4), rng)
+        symbols = sorted(sentence.symbols())
+        facts = {name: rng.random() < 0.5
+                 for name in rng.sample(symbols, min(len(symbols), 2))}
+        given = And(*[Symbol(name) if value else Not(Symbol(name))
+                      for name, value in facts.items()])
+        simplified, report = simplify(sentence, facts)
+        assert (truth_table(And(given, simplified), symbols)
+                == truth_table(And(given, sentence), symbols))
+
+
+def test_model_counts_match_enumeration():
+    rng = random.Random(2)
+    for i in range(200):
+        n = rng.randint(2, 8)
+        if i % 2:
+            knowledge = random_cnf(n, rng.uniform(1, 5), 3, rng)
+        else:
+            knowledge = random_sentence(n, rng.randint(1, 4), rng)
+
+        # One extra symbol the knowledge base does not mention
+        symbols = sorted(knowledge.symbols() | {"extra"})
+        total, counts = model_counts(knowledge, ["extra"])
+
+        columns = symbol_columns(symbols)
+        models = knowledge.truth_table(columns, (1 << (1 << len(symbols))) - 1)
+        assert total == models.bit_count()
+        assert counts == {
+            name: (models & columns[name]).bit_count() for name in symbols
+        }
+        assert count_models(knowledge, ["extra"]) == total
+
+
+@pytest.mark.parametrize("clause_limit", [logic.CLAUSE_LIMIT, 3])
+def test_resolution_check_matches_model_check(monkeypatch, clause_limit):
+
+    # A small limit sends most knowledge bases through to_cnf
+    monkeypatch.setattr(logic, "CLAUSE_LIMIT", clause_limit)
+    monkeypatch.setattr(logic, "_premise_cache", weakref.WeakKeyDictionary())
+    rng = random.Random(3)
+    for i in range(300):
+        n = rng.randint(2, 8)
+        knowledge = random_sentence(n, rng.randint(1, 4), rng)
+
+        # Queries may mention symbols the knowledge base does not
+        query = random_query(n + 2, rng)
+        assert (resolution_check(knowledge, query)
+                == model_check_truth_table(knowledge, query))
+
+
+def test_resolution_check_with_tseitin_premises():
+    x = symbols(26)
+    knowledge = And(Or(*[And(x[2 * i], x[2 * i + 1]) for i in range(13)]),
+                    x[0], x[1])
+    assert not resolution_check(knowledge, Symbol("fresh"))
+    assert resolution_check(knowledge, x[1])
+
+
+def test_compiled_sentences_match_evaluate():
+    rng = random.Random(4)
+    for i in range(300):
+        sentence = random_sentence(rng.randint(1, 6), rng.randint(0, 4), rng)
+        names = sorted(sentence.symbols())
+        check = compile_sentence(sentence, names)
+        for m in range(1 << len(names)):
+            model = {name: bool(m >> i & 1) for i, name in enumerate(names)}
+            assert check(m) == sentence.evaluate(model)
+
+
+def test_compiled_sentences_stay_flat_when_deeply_nested():
+    a, b = Symbol("A"), Symbol("B")
+    sentence = a
+    for i in range(2000):
+        sentence = Not(Or(sentence, b)) if i % 2 else And(sentence, b)
+    check = compile_sentence(sentence, ["A", "B"])
+    assert [check(m) for m in range(4)] == [1, 1, 0, 0]
+    assert model_check_compiled(sentence, Not(b))
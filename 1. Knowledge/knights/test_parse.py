@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from benchmark import random_sentence
+from logic import *
+from parse import parse
+
+
+def equivalent(a, b):
+    symbols = sorted(a.symbols() | b.symbols())
+    return truth_table(a, symbols) == truth_table(b, symbols)
+
+
+def test_formula_round_trips():
+    rng = random.Random(0)
+    for i in range(300):
+        sentence = random_sentence(rng.randint(1, 6), rng.randint(1, 5), rng)
+        assert equivalent(parse(sentence.formula()), sentence)
+
+
+def test_empty_and_constant_sentences_round_trip():
+    for sentence in [And(), Or(), Constant(True), Constant(False),
+                     And(Or(), Symbol("A")), Not(And())]:
+        assert equivalent(parse(sentence.formula()), sentence)
+
+
+def test_ascii_operators():
+    a, b, c = Symbol("A"), Symbol("B"), Symbol("C")
+    assert parse("A -> B -> C") is Implication(a, Implication(b, c))
+    assert parse("~A & B | C <-> A") is Biconditional(
+        Or(And(Not(a), b), c), a
+    )
+    assert parse("A is a Knight & !(B is a Knave)") is And(
+        Symbol("A is a Knight"), Not(Symbol("B is a Knave"))
+    )
+
+
+@pytest.mark.parametrize("text", [
+    "A <= B", "A = B", "A - B", "A > B", "A &", "(A", "A)", "", "& A"
+])
+def test_malformed_formulas_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse(text)
@@ -1,5 +1,159 @@
 import itertools
+import logging
+import math
 import random
+import time
+from fractions import Fraction
+
+logger = logging.getLogger(__name__)
+
+# Mine density assumed when the total number of mines is not known
+DENSITY = 0.2
+
+# Most search steps spent enumerating the mines of one frontier component
+SEARCH_LIMIT = 200000
+
+
+class CellSet():
+    """
+    Set of cells on a board, stored as one bitmask per row
+    so that whole rows are combined with bitwise operations.
+    """
+
+    def __init__(self, height, width, cells=()):
+        self.height = height
+        self.width = width
+        self.rows = [0] * height
+        self.size = 0
+        for cell in cells:
+            self.add(cell)
+
+    @classmethod
+    def full(cls, height, width):
+        """
+        Returns the set of every cell on the board.
+        """
+        cells = cls(height, width)
+        cells.rows = [(1 << width) - 1] * height
+        cells.size = height * width
+        return cells
+
+    @classmethod
+    def from_rows(cls, height, width, rows):
+        """
+        Returns the set of cells whose bits are set in `rows`.
+        """
+        cells = cls(height, width)
+        cells.rows = rows
+        cells.size = sum(row.bit_count() for row in rows)
+        return cells
+
+    def __contains__(self, cell):
+        i, j = cell
+        return (0 <= i < self.height and 0 <= j < self.width
+                and bool(self.rows[i] >> j & 1))
+
+    def __iter__(self):
+        for i, row in enumerate(self.rows):
+            while row:
+                low = row & -row
+                yield (i, low.bit_length() - 1)
+                row ^= low
+
+    def __len__(self):
+        return self.size
+
+    def __eq__(self, other):
+        if isinstance(other, CellSet):
+            return self.rows == other.rows
+        return set(self) == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"CellSet({set(self)})"
+
+    def add(self, cell):
+        i, j = cell
+        bit = 1 << j
+        if not self.rows[i] & bit:
+            self.rows[i] |= bit
+            self.size += 1
+
+    def discard(self, cell):
+        i, j = cell
+        bit = 1 << j
+        if self.rows[i] & bit:
+            self.rows[i] ^= bit
+            self.size -= 1
+
+    def remove(self, cell):
+        if cell not in self:
+            raise KeyError(cell)
+        self.discard(cell)
+
+    def copy(self):
+        return CellSet.from_rows(self.height, self.width, list(self.rows))
+
+    def __or__(self, other):
+        return CellSet.from_rows(self.height, self.width, [
+            a | b for a, b in zip(self.rows, other.rows)
+        ])
+
+    def __and__(self, other):
+        return CellSet.from_rows(self.height, self.width, [
+            a & b for a, b in zip(self.rows, other.rows)
+        ])
+
+    def __sub__(self, other):
+        return CellSet.from_rows(self.height, self.width, [
+            a & ~b for a, b in zip(self.rows, other.rows)
+        ])
+
+
+class CellPool():
+    """
+    Set of cells kept as a list and each cell's position in it,
+    so that adding, removing and picking a random cell take O(1).
+    """
+
+    def __init__(self, cells=()):
+        self.cells = []
+        self.positions = dict()
+        for cell in cells:
+            self.add(cell)
+
+    def __contains__(self, cell):
+        return cell in self.positions
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def add(self, cell):
+        if cell not in self.positions:
+            self.positions[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def discard(self, cell):
+        """
+        Removes a cell by moving the last cell into its place.
+        """
+        position = self.positions.pop(cell, None)
+        if position is None:
+            return
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[position] = last
+            self.positions[last] = position
+
+    def last(self):
+        return self.cells[-1]
+
+    def choice(self):
+        return self.cells[random.randrange(len(self.cells))]
 
 
 class Minesweeper():
@@ -7,31 +161,42 @@ class Minesweeper():
     Minesweeper game representation
     """
 
-    def __init__(self, height=8, width=8, mines=8):
+    def __init__(self, height=8, width=8, mines=8, safe=None, rng=None):
+        """
+        Creates a board with `mines` mines placed at random using `rng`
+        (the random module by default). If `safe` is a cell, it and,
+        where there is room, its neighbors are kept free of mines.
+        """
 
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
-
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        self.mines = CellSet(height, width)
+        rng = rng or random
+
+        # Cells kept free so that the first click is safe
+        excluded = set()
+        if safe is not None:
+            excluded = {
+                i * width + j
+                for i in range(safe[0] - 1, safe[0] + 2)
+                for j in range(safe[1] - 1, safe[1] + 2)
+                if 0 <= i < height and 0 <= j < width
+            }
+            if height * width - len(excluded) < mines:
+                excluded = {safe[0] * width + safe[1]}
+
+        # Sample mine positions without replacement, all at once
+        positions = rng.sample(range(height * width), mines + len(excluded))
+        positions = [p for p in positions if p not in excluded][:mines]
+        for position in positions:
+            self.mines.add(divmod(position, width))
+
+        # Count neighboring mines of every cell once
+        self.clues = clue_grid(self.mines)
 
         # At first, player has found no mines
-        self.mines_found = set()
+        self.mines_found = CellSet(height, width)
 
     def print(self):
         """
@@ -41,7 +206,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if (i, j) in self.mines:
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -49,8 +214,7 @@ class Minesweeper():
         print("--" * self.width + "-")
 
     def is_mine(self, cell):
-        i, j = cell
-        return self.board[i][j]
+        return cell in self.mines
 
     def nearby_mines(self, cell):
         """
@@ -58,30 +222,160 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        i, j = cell
+        return self.clues[i][j]
 
-        # Keep count of nearby mines
-        count = 0
+    def won(self):
+        """
+        Checks if all mines have been flagged.
+        """
+        return self.mines_found == self.mines
 
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
 
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
+class LinearSystem():
+    """
+    Sentences as linear equations over cells worth 1 if a mine and 0
+    if safe, kept in reduced row echelon form: every row has a pivot
+    cell with coefficient 1 that appears in no other row.
+    """
 
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+    def __init__(self):
 
-        return count
+        # Rows by pivot cell, as [coefficients by cell, value]
+        self.rows = dict()
 
-    def won(self):
+        # Pivots of the rows mentioning each cell
+        self.columns = dict()
+
+        # Pivots of rows changed since deductions were last made
+        self.changed = set()
+
+    def add(self, cells, count):
         """
-        Checks if all mines have been flagged.
+        Adds the equation saying that `count` of `cells` are mines.
         """
-        return self.mines_found == self.mines
+        self.insert({cell: Fraction(1) for cell in cells}, Fraction(count))
+
+    def insert(self, coefficients, value):
+        """
+        Reduces an equation by the existing rows and adds it as a new row,
+        eliminating its pivot from the others.
+        """
+
+        # Pivot cells of other rows never appear in each other's rows,
+        # so one pass removes them all
+        for pivot in [cell for cell in coefficients if cell in self.rows]:
+            factor = coefficients[pivot]
+            row, rhs = self.rows[pivot]
+            for cell, coefficient in row.items():
+                remaining = coefficients.get(cell, 0) - factor * coefficient
+                if remaining:
+                    coefficients[cell] = remaining
+                else:
+                    coefficients.pop(cell, None)
+            value -= factor * rhs
+        if not coefficients:
+            return
+
+        pivot = next(iter(coefficients))
+        scale = coefficients[pivot]
+        coefficients = {cell: c / scale for cell, c in coefficients.items()}
+        value /= scale
+
+        # Eliminate the new pivot from the rows that mention it
+        for other in list(self.columns.get(pivot, ())):
+            row = self.rows[other]
+            factor = row[0][pivot]
+            for cell, coefficient in coefficients.items():
+                remaining = row[0].get(cell, 0) - factor * coefficient
+                if remaining:
+                    row[0][cell] = remaining
+                    self.columns.setdefault(cell, set()).add(other)
+                else:
+                    row[0].pop(cell, None)
+                    self.columns[cell].discard(other)
+            row[1] -= factor * value
+            self.changed.add(other)
+
+        self.rows[pivot] = [coefficients, value]
+        for cell in coefficients:
+            self.columns.setdefault(cell, set()).add(pivot)
+        self.changed.add(pivot)
+
+    def assign(self, cell, value):
+        """
+        Substitutes a known value for a cell in every row.
+        """
+        for pivot in self.columns.pop(cell, ()):
+            row = self.rows[pivot]
+            row[1] -= row[0].pop(cell) * value
+            if pivot == cell:
+
+                # The row lost its pivot, so it is reduced again
+                del self.rows[pivot]
+                self.changed.discard(pivot)
+                for other in row[0]:
+                    self.columns[other].discard(pivot)
+                self.insert(row[0], row[1])
+            else:
+                self.changed.add(pivot)
+
+    def deductions(self):
+        """
+        Returns cells whose values are forced by a changed row, mapped to
+        1 for mines and 0 for safe cells. A row's value can only reach the
+        sum of its negative or of its positive coefficients if every cell
+        takes its extreme value.
+        """
+        found = dict()
+        for pivot in self.changed:
+            if pivot not in self.rows:
+                continue
+            coefficients, value = self.rows[pivot]
+            low = sum(c for c in coefficients.values() if c < 0)
+            high = sum(c for c in coefficients.values() if c > 0)
+            if value == low:
+                for cell, c in coefficients.items():
+                    found[cell] = 1 if c < 0 else 0
+            elif value == high:
+                for cell, c in coefficients.items():
+                    found[cell] = 1 if c > 0 else 0
+        self.changed = set()
+        return found
+
+
+def clue_grid(mines):
+    """
+    Returns, for every cell, the number of mines among its neighbors,
+    summing each row over three columns and then three rows.
+    """
+    width = mines.width
+    grid = [[row >> j & 1 for j in range(width)] for row in mines.rows]
+
+    # Sum each cell with its left and right neighbors
+    across = [
+        [a + b + c for a, b, c in zip([0] + row[:-1], row, row[1:] + [0])]
+        for row in grid
+    ]
+
+    # Sum those over the rows above and below, leaving out the cell itself
+    blank = [0] * width
+    return [
+        [a + b + c - m for a, b, c, m in zip(above, middle, below, row)]
+        for above, middle, below, row in zip(
+            [blank] + across[:-1], across, across[1:] + [blank], grid
+        )
+    ]
+
+
+def generate_boards(count, height=8, width=8, mines=8, seed=0, safe=None):
+    """
+    Yields `count` boards, the k-th seeded with `seed + k`
+    so that the same boards can be recreated.
+    """
+    for k in range(count):
+        yield Minesweeper(height, width, mines, safe=safe,
+                          rng=random.Random(seed + k))
 
 
 class Sentence():
@@ -144,21 +438,64 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, inference="subset",
+                 stats=False):
 
-        # Set initial height and width
+        # Set initial height, width and total number of mines, if known
         self.height = height
         self.width = width
+        self.total_mines = mines
 
         # Keep track of which cells have been clicked on
-        self.moves_made = set()
+        self.moves_made = CellSet(height, width)
 
         # Keep track of cells known to be safe or mines
-        self.mines = set()
-        self.safes = set()
-
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        self.mines = CellSet(height, width)
+        self.safes = CellSet(height, width)
+
+        # Safe cells not yet clicked on, and unknown cells that no
+        # sentence mentions; unknown cells that some sentence mentions
+        # are the keys of self.cell_sentences
+        self.safe_moves = CellPool()
+        self.interior = CellPool(
+            (i, j) for i in range(height) for j in range(width)
+        )
+
+        # Sentences about the game known to be true, by id
+        self.knowledge = dict()
+        self.next_id = 0
+
+        # Ids of the sentences that mention each cell
+        self.cell_sentences = dict()
+
+        # Sentence ids by canonical form, and canonical form by id
+        self.signatures = dict()
+        self.signature_of = dict()
+
+        # Ids of sentences changed since inference last looked at them
+        self.pending = set()
+
+        # In "linear" inference, sentences are also kept as a linear
+        # system, which finds conclusions that need several sentences
+        if inference not in ("subset", "linear"):
+            raise ValueError(f"unknown inference mode {inference!r}")
+        self.linear = LinearSystem() if inference == "linear" else None
+
+        # Optional counters and timings of inference, None when disabled
+        self.stats = None
+        if stats:
+            self.stats = {
+                "add_knowledge_calls": 0,
+                "rules": dict.fromkeys([
+                    "known_mines", "known_safes", "subset", "linear",
+                    "duplicate", "empty"
+                ], 0),
+                "seconds": dict.fromkeys(
+                    ["sentence", "subsets", "linear"], 0.0
+                ),
+                "knowledge_size": 0,
+                "peak_knowledge": 0
+            }
 
     def mark_mine(self, cell):
         """
@@ -166,8 +503,12 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.interior.discard(cell)
+        for sid in self.cell_sentences.pop(cell, ()):
+            self.knowledge[sid].mark_mine(cell)
+            self.changed(sid)
+        if self.linear is not None:
+            self.linear.assign(cell, 1)
 
     def mark_safe(self, cell):
         """
@@ -175,8 +516,187 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.interior.discard(cell)
+        if cell not in self.moves_made:
+            self.safe_moves.add(cell)
+        for sid in self.cell_sentences.pop(cell, ()):
+            self.knowledge[sid].mark_safe(cell)
+            self.changed(sid)
+        if self.linear is not None:
+            self.linear.assign(cell, 0)
+
+    def signature(self, cells, count):
+        """
+        Returns the canonical form of a sentence: its lowest cell index,
+        a bitmask of its cells relative to that index, and its count.
+        """
+        indices = [i * self.width + j for i, j in cells]
+        anchor = min(indices)
+        mask = 0
+        for index in indices:
+            mask |= 1 << (index - anchor)
+        return anchor, mask, count
+
+    def add_sentence(self, cells, count):
+        """
+        Adds a sentence to the knowledge base and queues it for inference,
+        unless it is empty or already known.
+        """
+        if not cells:
+            return
+        signature = self.signature(cells, count)
+        if signature in self.signatures:
+            return
+
+        sid = self.next_id
+        self.next_id += 1
+        self.knowledge[sid] = Sentence(cells, count)
+        self.signatures[signature] = sid
+        self.signature_of[sid] = signature
+        for cell in cells:
+            self.cell_sentences.setdefault(cell, set()).add(sid)
+            self.interior.discard(cell)
+        self.pending.add(sid)
+        if self.linear is not None:
+            self.linear.add(cells, count)
+
+    def retire(self, sid):
+        """
+        Removes a sentence that carries no more information.
+        """
+        sentence = self.knowledge.pop(sid)
+        self.unindex(sid, sentence.cells)
+        self.pending.discard(sid)
+        signature = self.signature_of.pop(sid, None)
+        if self.signatures.get(signature) == sid:
+            del self.signatures[signature]
+
+    def changed(self, sid):
+        """
+        Updates the canonical form of a sentence whose cells changed,
+        retiring it if it became empty or a duplicate, and queues it.
+        """
+        sentence = self.knowledge[sid]
+        signature = self.signature_of.pop(sid)
+        if self.signatures.get(signature) == sid:
+            del self.signatures[signature]
+
+        if not sentence.cells:
+            self.retire(sid)
+            if self.stats is not None:
+                self.stats["rules"]["empty"] += 1
+            return
+        signature = self.signature(sentence.cells, sentence.count)
+        if signature in self.signatures:
+            self.retire(sid)
+            if self.stats is not None:
+                self.stats["rules"]["duplicate"] += 1
+            return
+        self.signatures[signature] = sid
+        self.signature_of[sid] = signature
+        self.pending.add(sid)
+
+    def unindex(self, sid, cells):
+        """
+        Removes sentence `sid` from the index entries of `cells`.
+        """
+        for cell in cells:
+            sentences = self.cell_sentences[cell]
+            sentences.discard(sid)
+            if not sentences:
+                del self.cell_sentences[cell]
+
+    def subtract(self, sid, other):
+        """
+        Reduces sentence `sid` by the sentence `other` it contains.
+        """
+        sentence = self.knowledge[sid]
+        subset = self.knowledge[other]
+        self.unindex(sid, subset.cells)
+        sentence.cells -= subset.cells
+        sentence.count -= subset.count
+        self.changed(sid)
+
+    def neighbors(self, sid):
+        """
+        Returns the ids of other sentences sharing a cell with sentence `sid`.
+        """
+        found = set()
+        for cell in self.knowledge[sid].cells:
+            found |= self.cell_sentences[cell]
+        found.discard(sid)
+        return found
+
+    def infer(self):
+        """
+        Draws conclusions from changed sentences until nothing changes:
+            - sentences whose cells are all mines or all safe
+              have their cells marked and are retired,
+            - empty sentences are retired,
+            - a sentence containing another one is reduced
+              to the difference between the two,
+            - in linear inference, cells forced by the reduced
+              linear system are marked.
+        """
+        stats = self.stats
+        while self.pending:
+            if stats is not None:
+                start = time.perf_counter()
+            self.infer_subsets()
+            if stats is not None:
+                stats["seconds"]["subsets"] += time.perf_counter() - start
+
+            if self.linear is not None:
+                if stats is not None:
+                    start = time.perf_counter()
+                deductions = self.linear.deductions()
+                for cell, value in deductions.items():
+                    if value:
+                        self.mark_mine(cell)
+                    else:
+                        self.mark_safe(cell)
+                if stats is not None:
+                    stats["rules"]["linear"] += len(deductions)
+                    stats["seconds"]["linear"] += time.perf_counter() - start
+
+    def infer_subsets(self):
+        """
+        Applies sentence-by-sentence inference until no sentence changes.
+        """
+        while self.pending:
+            sid = self.pending.pop()
+            sentence = self.knowledge.get(sid)
+            if sentence is None:
+                continue
+
+            # Resolve sentences whose cells are all mines or all safe
+            if not sentence.cells:
+                self.retire(sid)
+                continue
+            mines = sentence.known_mines()
+            safes = sentence.known_safes()
+            if self.stats is not None:
+                self.stats["rules"]["known_mines"] += len(mines)
+                self.stats["rules"]["known_safes"] += len(safes)
+            if mines or safes:
+                for cell in list(mines):
+                    self.mark_mine(cell)
+                for cell in list(safes):
+                    self.mark_safe(cell)
+                continue
+
+            # Compare with sentences sharing a cell
+            for other in self.neighbors(sid):
+                other_sentence = self.knowledge[other]
+                if other_sentence.cells < sentence.cells:
+                    self.subtract(sid, other)
+                    if self.stats is not None:
+                        self.stats["rules"]["subset"] += 1
+                    break
+                elif sentence.cells < other_sentence.cells:
+                    self.subtract(other, sid)
+                    if self.stats is not None:
+                        self.stats["rules"]["subset"] += 1
 
     def add_knowledge(self, cell, count):
         """
@@ -193,12 +713,17 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
+        stats = self.stats
+        if stats is not None:
+            start = time.perf_counter()
+
         #   Mark cell as a move made
         self.moves_made.add(cell)
+        self.safe_moves.discard(cell)
 
         #   Mark cell as safe
         self.mark_safe(cell)
-        
+
         #   Loop through all neighboring cells and prepare new knowledge to be added
         sentence_cells = set()
         for i in range(cell[0] - 1, cell[0] + 2):
@@ -215,38 +740,22 @@ class MinesweeperAI():
 
                 if i >= 0 and i < self.height and j >= 0 and j < self.width:
                     sentence_cells.add((i,j))
-        
-        #   Create the new knowledge sentence
-        new_knowledge = Sentence(sentence_cells, count)
-
-        #   If all cells in the sentece are safe or mines - mark them accordingly
-        if len(new_knowledge.cells) == count:
-            for cell in new_knowledge.cells:
-                self.mark_mine(cell)
-        elif count == 0:
-            for cell in new_knowledge.cells:
-                self.mark_safe(cell)
-
-        #   Compare each current knowledge sentece to the new one
-        for sentence in self.knowledge:
-            if new_knowledge.cells in sentence.cells:
-                sentence.cells -= new_knowledge.cells
-                sentence.count -= new_knowledge.count
-
-                if len(sentence.cells) == count:
-                    for cell in sentence.cells:
-                        self.mark_mine(cell)
-                elif count == 0:
-                    for cell in sentence.cells:
-                        self.mark_safe(cell)
 
-        #   Add the gained knowledge sentence to knowledge base
-        self.knowledge.append(Sentence(sentence_cells, count))
+        #   Add the new sentence and infer everything that follows from it
+        self.add_sentence(sentence_cells, count)
+        if stats is not None:
+            stats["seconds"]["sentence"] += time.perf_counter() - start
+        self.infer()
 
-        #   Prints known mines for the user to flag them
-        print("Known mines:")
-        print(self.mines)
+        if stats is not None:
+            stats["add_knowledge_calls"] += 1
+            stats["knowledge_size"] = len(self.knowledge)
+            stats["peak_knowledge"] = max(
+                stats["peak_knowledge"], len(self.knowledge)
+            )
 
+        #   Reports known mines for the user to flag them
+        logger.info("Known mines: %s", self.mines)
 
     def make_safe_move(self):
         """
@@ -257,46 +766,207 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        #   Checks if there are any safe moves and returns it
-        for safe_move in self.safes:
-            if safe_move not in self.moves_made:
-                return safe_move
-            
+        #   Checks if there are any safe moves and returns one
+        if self.safe_moves:
+            return self.safe_moves.last()
+
         return None
 
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
+        Chooses among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        the one least likely to be a mine.
         """
-        #   Collects all possible moves that can be made
-        possible_moves = set()
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i,j) not in self.moves_made and (i,j) not in self.mines:
-                    possible_moves.add((i,j))
+        #   Known safe cells are moves too
+        if self.safe_moves:
+            return self.safe_moves.last()
 
         #   If there are no possible moves to make return None
-        if len(possible_moves) == 0:
+        if not self.cell_sentences and not self.interior:
             return None
 
-        #   Collects all moves that are known to possibly be mines
-        possible_mines = set()
-        for info in self.knowledge:
-            for tuple in info.cells:
-                possible_mines.add(tuple)
+        #   Cells mentioned by some sentence might be mines,
+        #   all other cells share the same probability
+        probabilities, interior = self.mine_probabilities()
 
-        #   Gets all moves of which we do not have any knowledge
-        ideal_moves = list(possible_moves - possible_mines)
+        #   Take the frontier cell least likely to be a mine, unless
+        #   a cell we know nothing about is safer
+        if probabilities:
+            cell = min(probabilities, key=probabilities.get)
+            if not self.interior or probabilities[cell] <= interior:
+                return cell
+        return self.interior.choice()
 
-        #   If there are moves we know nothing about then make that move, 
-        #   otherwise risk by taking one of the moves that are possibly bombs
-        if len(ideal_moves) > 0:
-            index = random.randrange(0, len(ideal_moves))
-            return ideal_moves[index]
+    def mine_probabilities(self):
+        """
+        Returns the probability that each cell mentioned by a sentence is
+        a mine, and the probability shared by every other unknown cell.
+
+        Cells are split into components that share no sentence. The mine
+        configurations consistent with each component's sentences are
+        enumerated, and each combination of configurations is weighted
+        by the number of ways to place the remaining mines elsewhere.
+        """
+        frontier = self.cell_sentences.keys()
+        unknown = len(self.interior)
+
+        distributions = []
+        probabilities = dict()
+        for cells in self.components():
+            try:
+                distributions.append((cells, self.configurations(cells)))
+            except OverflowError:
+
+                # Too many configurations, estimate from sentences alone
+                for cell in cells:
+                    probabilities[cell] = max(
+                        self.knowledge[sid].count
+                        / len(self.knowledge[sid].cells)
+                        for sid in self.cell_sentences[cell]
+                    )
+
+        # Weight of a total of k mines in the frontier
+        if self.total_mines is None:
+            ratio = DENSITY / (1 - DENSITY)
+            weight = lambda k: ratio ** k
+        else:
+            remaining = self.total_mines - len(self.mines)
+            weight = combinations_weight(unknown, remaining)
+
+        # Combine each component with the distribution of all the others
+        totals = [counts for cells, (counts, cell_counts) in distributions]
+        total = convolve(totals)
+        normalizer = sum(c * weight(k) for k, c in enumerate(total))
+        if normalizer == 0:
+            p = DENSITY if self.total_mines is None else 0.5
+            probabilities.update(dict.fromkeys(frontier, p))
+            return probabilities, p
+
+        for j, (cells, (counts, cell_counts)) in enumerate(distributions):
+            others = convolve(totals[:j] + totals[j + 1:])
+            scale = [
+                sum(c * weight(k + m) for m, c in enumerate(others))
+                for k in range(len(counts))
+            ]
+            for i, cell in enumerate(cells):
+                probabilities[cell] = sum(
+                    cell_counts[k][i] * scale[k] for k in range(len(counts))
+                ) / normalizer
+
+        # Remaining mines are spread evenly over the other unknown cells
+        if self.total_mines is None or unknown == 0:
+            interior = DENSITY
         else:
-            possible_mines = list(possible_mines)
-            index = random.randrange(0, len(possible_mines))
-            return possible_mines[index]
+            interior = sum(
+                c * weight(k) * (remaining - k) / unknown
+                for k, c in enumerate(total)
+            ) / normalizer
+        return probabilities, interior
+
+    def components(self):
+        """
+        Returns lists of cells mentioned by sentences, grouped so that
+        no sentence mentions cells of two different groups.
+        """
+        groups = []
+        seen = set()
+        for start in self.cell_sentences:
+            if start in seen:
+                continue
+            seen.add(start)
+            group = [start]
+            for cell in group:
+                for sid in self.cell_sentences[cell]:
+                    for other in self.knowledge[sid].cells:
+                        if other not in seen:
+                            seen.add(other)
+                            group.append(other)
+            groups.append(group)
+        return groups
+
+    def configurations(self, cells):
+        """
+        Counts the mine configurations of `cells` consistent with the
+        sentences mentioning them. Returns a list of configuration counts
+        by number of mines, and for each number of mines a list of how
+        often each cell is a mine. Raises OverflowError if the search
+        takes more than SEARCH_LIMIT steps.
+        """
+        position = {cell: i for i, cell in enumerate(cells)}
+        sids = list(set().union(
+            *(self.cell_sentences[cell] for cell in cells)
+        ))
+        needed = [self.knowledge[sid].count for sid in sids]
+        unassigned = [len(self.knowledge[sid].cells) for sid in sids]
+        touching = [[] for cell in cells]
+        for c, sid in enumerate(sids):
+            for cell in self.knowledge[sid].cells:
+                touching[position[cell]].append(c)
+
+        counts = [0] * (len(cells) + 1)
+        cell_counts = [[0] * len(cells) for k in range(len(cells) + 1)]
+        assignment = [0] * len(cells)
+        steps = 0
+
+        def search(i, mines):
+            nonlocal steps
+            steps += 1
+            if steps > SEARCH_LIMIT:
+                raise OverflowError("too many mine configurations")
+            if i == len(cells):
+                counts[mines] += 1
+                for index, value in enumerate(assignment):
+                    cell_counts[mines][index] += value
+                return
+            for value in (0, 1):
+                for c in touching[i]:
+                    needed[c] -= value
+                    unassigned[c] -= 1
+                if all(0 <= needed[c] <= unassigned[c] for c in touching[i]):
+                    assignment[i] = value
+                    search(i + 1, mines + value)
+                for c in touching[i]:
+                    needed[c] += value
+                    unassigned[c] += 1
+            assignment[i] = 0
+
+        search(0, 0)
+        return counts, cell_counts
+
+
+def convolve(distributions):
+    """
+    Returns the distribution of the total number of mines
+    over several independent lists of counts by number of mines.
+    """
+    total = [1]
+    for counts in distributions:
+        result = [0] * (len(total) + len(counts) - 1)
+        for a, x in enumerate(total):
+            if x:
+                for b, y in enumerate(counts):
+                    result[a + b] += x * y
+        total = result
+    return total
+
+
+def combinations_weight(unknown, remaining):
+    """
+    Returns a function giving, relative to one another, the number of
+    ways to place `remaining - k` mines among `unknown` cells.
+    """
+    def log_ways(k):
+        return (math.lgamma(unknown + 1) - math.lgamma(remaining - k + 1)
+                - math.lgamma(unknown - remaining + k + 1))
+
+    offset = log_ways(max(0, remaining - unknown))
+
+    def weight(k):
+        if not 0 <= remaining - k <= unknown:
+            return 0
+        return math.exp(log_ways(k) - offset)
+
+    return weight
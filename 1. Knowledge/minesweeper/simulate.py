@@ -0,0 +1,103 @@
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [2, 5, 6, 7]:
+        sys.exit("Usage: python simulate.py games "
+                 "[height width mines [processes [seed]]]")
+    games = int(sys.argv[1])
+    height, width, mines = (
+        map(int, sys.argv[2:5]) if len(sys.argv) >= 5 else (8, 8, 8)
+    )
+    processes = int(sys.argv[5]) if len(sys.argv) >= 6 else os.cpu_count()
+    seed = int(sys.argv[6]) if len(sys.argv) == 7 else 0
+
+    start = time.perf_counter()
+    jobs = [(height, width, mines, seed + game) for game in range(games)]
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.starmap(play, jobs)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps(summarize(results, height, width, mines, elapsed),
+                     indent=4))
+
+
+def play(height, width, mines, seed):
+    """
+    Plays one seeded game of Minesweeper with the AI.
+    Returns whether the AI won, how many moves it made, the time spent
+    playing and the AI's inference statistics.
+    """
+    rng = random.Random(seed)
+    game = Minesweeper(height=height, width=width, mines=mines, rng=rng)
+
+    # The AI draws from the global generator, seeded apart from the board
+    random.seed(rng.getrandbits(64))
+    ai = MinesweeperAI(height=height, width=width, mines=mines, stats=True)
+
+    moves = 0
+    start = time.perf_counter()
+    while moves < height * width - mines:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None or game.is_mine(move):
+            break
+        moves += 1
+        ai.add_knowledge(move, game.nearby_mines(move))
+
+    # Every safe cell revealed
+    return {
+        "won": moves == height * width - mines,
+        "moves": moves,
+        "seconds": time.perf_counter() - start,
+        "stats": ai.stats
+    }
+
+
+def summarize(results, height, width, mines, elapsed):
+    """Returns aggregate statistics over the results of many games."""
+    moves = sum(result["moves"] for result in results)
+    playing = sum(result["seconds"] for result in results)
+    stats = [result["stats"] for result in results]
+    calls = sum(game["add_knowledge_calls"] for game in stats)
+    phases = {
+        phase: sum(game["seconds"][phase] for game in stats)
+        for phase in ["sentence", "subsets", "linear"]
+    }
+    wins = sum(result["won"] for result in results)
+    return {
+        "games": len(results),
+        "height": height,
+        "width": width,
+        "mines": mines,
+        "wins": wins,
+        "win_rate": wins / len(results) if results else 0,
+        "moves": moves,
+        "moves_per_second": moves / playing if playing else 0,
+        "mean_add_knowledge_seconds": (
+            sum(phases.values()) / calls if calls else 0
+        ),
+        "phase_seconds": phases,
+        "rules": {
+            rule: sum(game["rules"][rule] for game in stats)
+            for rule in stats[0]["rules"]
+        } if stats else {},
+        "peak_knowledge": max(
+            (game["peak_knowledge"] for game in stats), default=0
+        ),
+        "seconds": elapsed
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import collections
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import heredity
+
+# Bytes of family input submitted to the pool but not yet written out.
+# A family's pedigree and results grow with its input, so this caps the
+# memory held by queued work, while small families still queue by the
+# thousand to keep every worker busy
+INPUT_BYTES_IN_FLIGHT = 32 * 2 ** 20
+
+# Methods usable in batch mode: "parallel" starts its own process pool,
+# which pool workers are not allowed to do, and families already run in
+# parallel here
+METHODS = [method for method in heredity.METHODS if method != "parallel"]
+
+# Columns of CSV output, one row per person
+FIELDS = ["id", "name", "gene_2", "gene_1", "gene_0",
+          "trait_true", "trait_false", "error"]
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [3, 4, 5]:
+        sys.exit("Usage: python batch.py (directory | families.jsonl) "
+                 "(output.jsonl | output.csv) [method [processes]]")
+    source, output = sys.argv[1:3]
+    method = sys.argv[3] if len(sys.argv) >= 4 else "elimination"
+    processes = int(sys.argv[4]) if len(sys.argv) == 5 else os.cpu_count()
+    if method not in METHODS:
+        sys.exit(f"Method must be one of: {', '.join(METHODS)}")
+
+    # Solve families as they are read, writing results in input order
+    totals = {"families": 0, "people": 0, "errors": 0,
+              "solving_seconds": 0.0, "slowest": None}
+    start = time.perf_counter()
+    with open(output, "w", newline="", encoding="utf-8") as f, \
+            multiprocessing.Pool(processes, initializer=init_worker,
+                                 initargs=(heredity.PROBS,)) as pool:
+        write = writer(f, output)
+        for result in run(pool, families(source), method):
+            tally(totals, result)
+            write(result)
+    elapsed = time.perf_counter() - start
+
+    # Report families and people solved per second of wall time
+    print(json.dumps(summarize(totals, elapsed, processes)),
+          file=sys.stderr)
+
+
+def families(source):
+    """
+    Yields the families in `source` one at a time, as an id, either
+    the path of a CSV file or a line of JSON, and the size of that
+    input in bytes. `source` is a directory
+    of CSV files like data/family0.csv, or a JSONL file whose lines
+    are objects with an "id" and a list of "people", each with a
+    "name", "mother", "father" and "trait" (true, false or null).
+    """
+    if os.path.isdir(source):
+        with os.scandir(source) as entries:
+            for entry in entries:
+                if entry.name.endswith(".csv") and entry.is_file():
+                    yield (entry.name[:-len(".csv")], entry.path, None,
+                           entry.stat().st_size)
+    else:
+        with open(source, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    yield number, None, line, len(line)
+
+
+def run(pool, families, method):
+    """
+    Submits `families` to `pool` and yields their results in input
+    order, waiting for the oldest family before submitting one that
+    would take the input in flight over INPUT_BYTES_IN_FLIGHT.
+    """
+    pending = collections.deque()
+    in_flight = 0
+    for family, path, line, size in families:
+        while pending and in_flight + size > INPUT_BYTES_IN_FLIGHT:
+            done, result = pending.popleft()
+            in_flight -= done
+            yield result.get()
+        result = pool.apply_async(solve_family,
+                                  (family, path, line, method))
+        pending.append((size, result))
+        in_flight += size
+    while pending:
+        yield pending.popleft()[1].get()
+
+
+def init_worker(probs):
+    """
+    Gives a worker process the parent's PROBS and builds its
+    probability tables once for every family it solves.
+    """
+    heredity.PROBS = probs
+    heredity.conditional_tables()
+
+
+def solve_family(family, path, line, method):
+    """
+    Returns the id, gene and trait distributions of each person and the
+    time taken for one family, or the id and an error if it can't be
+    read or solved.
+    """
+    start = time.perf_counter()
+    try:
+        if path is not None:
+            people = heredity.load_data(path)
+        else:
+            record = json.loads(line)
+            family = record.get("id", family)
+            people = {
+                person["name"]: {
+                    "name": person["name"],
+                    "mother": person.get("mother"),
+                    "father": person.get("father"),
+                    "trait": person.get("trait")
+                }
+                for person in record["people"]
+            }
+        probabilities = heredity.METHODS[method](people)
+    except Exception as error:
+        return {
+            "id": family,
+            "error": f"{type(error).__name__}: {error}",
+            "seconds": time.perf_counter() - start
+        }
+    return {
+        "id": family,
+        "probabilities": probabilities,
+        "seconds": time.perf_counter() - start
+    }
+
+
+def writer(f, output):
+    """
+    Returns a function writing one result to `f`, as a JSON line or as
+    CSV rows depending on the extension of `output`.
+    """
+    if not output.endswith(".csv"):
+        def write(result):
+            print(json.dumps(result), file=f)
+        return write
+
+    rows = csv.DictWriter(f, FIELDS)
+    rows.writeheader()
+
+    def write(result):
+        if "error" in result:
+            rows.writerow({"id": result["id"], "error": result["error"]})
+            return
+        for name, distributions in result["probabilities"].items():
+            rows.writerow({
+                "id": result["id"],
+                "name": name,
+                "gene_2": distributions["gene"][2],
+                "gene_1": distributions["gene"][1],
+                "gene_0": distributions["gene"][0],
+                "trait_true": distributions["trait"][True],
+                "trait_false": distributions["trait"][False]
+            })
+    return write
+
+
+def tally(totals, result):
+    """
+    Adds one family's result to running totals, which unlike a list
+    of per-family timings stay the same size however many families
+    are solved.
+    """
+    totals["families"] += 1
+    totals["solving_seconds"] += result["seconds"]
+    if "error" in result:
+        totals["errors"] += 1
+    else:
+        totals["people"] += len(result["probabilities"])
+    if (totals["slowest"] is None
+            or result["seconds"] > totals["slowest"]["seconds"]):
+        totals["slowest"] = {"id": result["id"],
+                             "seconds": result["seconds"]}
+
+
+def summarize(totals, elapsed, processes):
+    """
+    Returns throughput statistics for a batch: families and people
+    solved per second of wall time, and how busy the workers were.
+    """
+    return {
+        **totals,
+        "seconds": elapsed,
+        "families_per_second": totals["families"] / elapsed,
+        "people_per_second": totals["people"] / elapsed,
+        "worker_utilization": (
+            totals["solving_seconds"] / (elapsed * processes)
+        )
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
 import csv
 import itertools
+import multiprocessing
+import os
 import sys
+import time
+import warnings
+
+import numpy as np
 
 PROBS = {
 
@@ -36,16 +42,53 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Gene counts a person can have
+GENES = (0, 1, 2)
+
+# Probability tables derived from PROBS, see conditional_tables
+TABLES = dict()
+
+# Most assignments evaluated at once by the enumeration kernel
+BLOCK_SIZE = 1 << 15
+
+# Gibbs sampling sweeps discarded before counting, and run between
+# convergence checks
+BURN_IN = 100
+CHECK_SWEEPS = 50
+
+# Fewest effective samples for which likelihood weighting trusts
+# its own standard error
+MIN_EFFECTIVE_SAMPLES = 100
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python heredity.py data.csv [method]")
     people = load_data(sys.argv[1])
+    method = sys.argv[2] if len(sys.argv) == 3 else "elimination"
+    if method not in METHODS:
+        sys.exit(f"Method must be one of: {', '.join(METHODS)}")
+
+    # Compute gene and trait probabilities for each person
+    probabilities = METHODS[method](people)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+def empty_probabilities(people):
+    """
+    Returns gene and trait distributions for each person, all zero.
+    """
+    return {
         person: {
             "gene": {
                 2: 0,
@@ -60,39 +103,663 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
+def enumeration(people):
+    """
+    Returns each person's gene and trait distributions by summing the
+    joint probability of every assignment of genes and traits.
+
+    Assignments are numbered: a person's gene count is a base 3 digit
+    and an unknown trait a bit, while known traits are fixed, so
+    assignments that contradict the evidence are never generated.
+    Blocks of consecutive assignments are evaluated at once with NumPy.
+    """
+    pedigree = pedigree_arrays(people)
+    sums = enumerate_range(pedigree, 0, assignment_count(pedigree))
+    return marginals(people, *sums)
+
+
+def parallel_enumeration(people, processes=None, shards=None):
+    """
+    Returns the same distributions as `enumeration`, splitting the
+    numbered assignments into contiguous shards, each of which fixes
+    the gene counts of the last people, summed by a pool of processes.
+    """
+    processes = processes or os.cpu_count()
+    pedigree = pedigree_arrays(people)
+    total = assignment_count(pedigree)
+
+    # A few shards per process even out their running times
+    shards = min(shards or 4 * processes, total)
+    bounds = [total * k // shards for k in range(shards + 1)]
+    jobs = [(pedigree, bounds[k], bounds[k + 1]) for k in range(shards)]
+    if processes == 1:
+        results = list(itertools.starmap(enumerate_range, jobs))
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(enumerate_range, jobs)
+    return marginals(people, *merge_sums(results))
+
+
+def merge_sums(results):
+    """
+    Adds up the sums returned by `enumerate_range` for several ranges,
+    rescaling each to the largest offset.
+    """
+    offset = max(result[2] for result in results)
+    gene_sums = 0
+    trait_sums = 0
+    for genes, traits, shard_offset in results:
+        if shard_offset == -np.inf:
             continue
+        scale = np.exp(shard_offset - offset)
+        gene_sums = gene_sums + genes * scale
+        trait_sums = trait_sums + traits * scale
+    return gene_sums, trait_sums, offset
+
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
+def pedigree_arrays(people):
+    """
+    Returns the pedigree as NumPy arrays over the list of names: the
+    index of each person's mother and father (-1 for no parents), each
+    person's known trait (-1 if unknown), an order placing parents
+    before children, and log probability tables.
+    """
+    names = list(people)
+    index = {name: i for i, name in enumerate(names)}
+    mothers = np.array([
+        index.get(people[name]["mother"], -1) for name in names
+    ], dtype=np.intp)
+    fathers = np.array([
+        index.get(people[name]["father"], -1) for name in names
+    ], dtype=np.intp)
+    traits = np.array([
+        -1 if people[name]["trait"] is None else int(people[name]["trait"])
+        for name in names
+    ], dtype=np.intp)
+
+    tables = conditional_tables()
+    return {
+        "mothers": mothers,
+        "fathers": fathers,
+        "traits": traits,
+        "order": topological_order(mothers, fathers),
+        "log_gene": tables["log_gene"],
+        "log_inheritance": tables["log_inheritance"],
+        "log_trait": tables["log_trait"]
+    }
+
+
+def conditional_tables():
+    """
+    Returns probability tables derived from PROBS, as NumPy arrays:
+        "gene": of a founder's gene count,
+        "inheritance": of a child's gene count given their mother's and
+                       father's, indexed [child, mother, father],
+        "trait": of not having and having the trait given a gene count,
+                 indexed [gene, trait],
+    and their logs as "log_gene", "log_inheritance" and "log_trait".
+    The tables are built once and rebuilt whenever PROBS changes.
+    """
+    key = (
+        tuple(sorted(PROBS["gene"].items())),
+        tuple(sorted(
+            (gene, tuple(sorted(traits.items())))
+            for gene, traits in PROBS["trait"].items()
+        )),
+        PROBS["mutation"]
+    )
+    if TABLES.get("key") == key:
+        return TABLES
+
+    # Probability that a parent with each gene count passes the gene on
+    passes = np.array([PROBS["mutation"], 0.5, 1 - PROBS["mutation"]])
+    mother = passes[:, None]
+    father = passes[None, :]
+    inheritance = np.array([
+        (1 - mother) * (1 - father),
+        mother * (1 - father) + (1 - mother) * father,
+        mother * father
+    ])
+
+    TABLES.clear()
+    TABLES["key"] = key
+    TABLES["gene"] = np.array([PROBS["gene"][gene] for gene in GENES])
+    TABLES["inheritance"] = inheritance
+    TABLES["trait"] = np.array([
+        [PROBS["trait"][gene][False], PROBS["trait"][gene][True]]
+        for gene in GENES
+    ])
+    with np.errstate(divide="ignore"):
+        for table in ["gene", "inheritance", "trait"]:
+            TABLES[f"log_{table}"] = np.log(TABLES[table])
+    return TABLES
+
+
+def assignment_count(pedigree):
+    """
+    Returns the number of assignments of genes and unknown traits.
+    """
+    unknown = int(np.count_nonzero(pedigree["traits"] < 0))
+    return 3 ** len(pedigree["traits"]) * 2 ** unknown
+
+
+def enumerate_range(pedigree, start, stop):
+    """
+    Sums the joint probability of the assignments numbered `start` to
+    `stop` by person and gene count, and by person and trait.
+
+    Probabilities are computed as sums of logs and kept relative to the
+    largest log probability seen, which is returned with the sums:
+    the true sums are the returned ones times exp(offset).
+    """
+    traits = pedigree["traits"]
+    n = len(traits)
+    unknown = np.flatnonzero(traits < 0)
+    children = np.flatnonzero(pedigree["mothers"] >= 0)
+    founders = np.flatnonzero(pedigree["mothers"] < 0)
+    mothers = pedigree["mothers"][children]
+    fathers = pedigree["fathers"][children]
+    powers = 3 ** np.arange(n, dtype=np.int64)
+    people = np.arange(n)
+
+    gene_sums = np.zeros((n, 3))
+    trait_sums = np.zeros((n, 2))
+    offset = -np.inf
+    for block in range(start, stop, BLOCK_SIZE):
+        numbers = np.arange(block, min(block + BLOCK_SIZE, stop),
+                            dtype=np.int64)
+
+        # Unknown traits are the low bits, gene counts the base 3 rest
+        genes = numbers[:, None] // (powers << len(unknown)) % 3
+        have_trait = np.broadcast_to(traits, genes.shape).copy()
+        have_trait[:, unknown] = (
+            numbers[:, None] >> np.arange(len(unknown)) & 1
+        )
 
-            for two_genes in powerset(names - one_gene):
+        # Log of the joint probability of each assignment
+        log_p = (
+            pedigree["log_gene"][genes[:, founders]].sum(axis=1)
+            + pedigree["log_inheritance"][
+                genes[:, children], genes[:, mothers], genes[:, fathers]
+            ].sum(axis=1)
+            + pedigree["log_trait"][genes, have_trait].sum(axis=1)
+        )
+        top = log_p.max()
+        if top == -np.inf:
+            continue
+        if top > offset:
+            gene_sums *= np.exp(offset - top)
+            trait_sums *= np.exp(offset - top)
+            offset = top
+        p = np.broadcast_to(np.exp(log_p - offset)[:, None], genes.shape)
+        np.add.at(gene_sums, (people, genes), p)
+        np.add.at(trait_sums, (people, have_trait), p)
+    return gene_sums, trait_sums, offset
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+
+def marginals(people, gene_sums, trait_sums, offset=0):
+    """
+    Returns the normalized gene and trait distributions of each person
+    from sums of joint probabilities indexed like `people`.
+    """
+    probabilities = empty_probabilities(people)
+    for i, person in enumerate(people):
+        for gene in GENES:
+            probabilities[person]["gene"][gene] = float(gene_sums[i][gene])
+        probabilities[person]["trait"][True] = float(trait_sums[i][1])
+        probabilities[person]["trait"][False] = float(trait_sums[i][0])
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
 
-    # Print results
+
+def elimination(people):
+    """
+    Returns each person's gene and trait distributions by variable
+    elimination on the pedigree's Bayesian network.
+
+    Each person's gene count depends on their parents' gene counts and
+    their known trait depends on their own gene count. Unknown traits
+    sum to 1 and are left out.
+
+    Eliminating a person joins the factors mentioning them into a
+    cluster over them and their remaining neighbors, whose message goes
+    to the cluster of the first of those neighbors to be eliminated.
+    One pass of messages from the first eliminated person to the last,
+    and one back, gives every person's gene distribution. The time is
+    linear in the number of people and exponential only in the size of
+    the largest cluster, the width of the elimination order.
+    """
+    factors = pedigree_factors(people)
+    order, separators = elimination_order(factors)
+    position = {variable: i for i, variable in enumerate(order)}
+
+    # Each factor goes to the cluster of its first eliminated variable
+    assigned = {variable: [] for variable in order}
+    for factor in factors:
+        assigned[min(factor[0], key=position.get)].append(factor)
+
+    # Clusters form a forest, rooted at the last eliminated variables
+    children = {variable: [] for variable in order}
+    for variable in order:
+        if separators[variable]:
+            parent = min(separators[variable], key=position.get)
+            children[parent].append(variable)
+
+    # Messages towards the roots, over each cluster's separator
+    up = dict()
+    for variable in order:
+        up[variable] = normalized(sum_out(multiply(
+            assigned[variable] + [up[child] for child in children[variable]]
+        ), variable))
+
+    # Messages away from the roots, and each person's distribution
+    down = dict()
+    probabilities = empty_probabilities(people)
+    for variable in reversed(order):
+        incoming = [down[variable]] if variable in down else []
+        belief = marginalize(multiply(
+            assigned[variable] + incoming
+            + [up[child] for child in children[variable]]
+        ), [variable])
+        total = sum(belief[1].values())
+        for gene in GENES:
+            probabilities[variable]["gene"][gene] = (
+                belief[1][(gene,)] / total
+            )
+
+        for child in children[variable]:
+            down[child] = normalized(marginalize(multiply(
+                assigned[variable] + incoming
+                + [up[other] for other in children[variable]
+                   if other != child]
+            ), separators[child]))
+    trait_marginals(people, probabilities)
+    return probabilities
+
+
+def trait_marginals(people, probabilities):
+    """
+    Fills in each person's trait distribution from their gene
+    distribution, or from their trait if it is known.
+    """
+    having = conditional_tables()["trait"][:, 1].tolist()
     for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+        trait = people[person]["trait"]
+        if trait is None:
+            genes = probabilities[person]["gene"]
+            p = sum(genes[gene] * having[gene] for gene in GENES)
+        else:
+            p = 1 if trait else 0
+        probabilities[person]["trait"][True] = p
+        probabilities[person]["trait"][False] = 1 - p
+
+
+def pedigree_factors(people):
+    """
+    Returns one factor per person, as a tuple of variables and a table
+    from their gene counts to a probability: the probability of the
+    person's gene count given their parents', times the probability
+    of their trait, if known, given their gene count.
+    """
+    tables = conditional_tables()
+    gene_table = tables["gene"].tolist()
+    inheritance = tables["inheritance"].tolist()
+    trait_table = tables["trait"].tolist()
+
+    factors = []
+    for person in people:
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        trait = people[person]["trait"]
+        variables = (person,) if mother is None else (person, mother, father)
+        table = dict()
+        for genes in itertools.product(GENES, repeat=len(variables)):
+            gene = genes[0]
+            if mother is None:
+                p = gene_table[gene]
+            else:
+                p = inheritance[gene][genes[1]][genes[2]]
+            if trait is not None:
+                p *= trait_table[gene][trait]
+            table[genes] = p
+        factors.append((variables, table))
+    return factors
+
+
+def elimination_order(factors):
+    """
+    Returns an order in which to eliminate the variables of `factors`,
+    always choosing next the variable with the fewest neighbors, that is
+    the one whose elimination creates the smallest factor, and the
+    neighbors each variable has when it is eliminated.
+    """
+    neighbors = dict()
+    for variables, table in factors:
+        for variable in variables:
+            neighbors.setdefault(variable, set()).update(variables)
+    for variable in neighbors:
+        neighbors[variable].discard(variable)
+
+    order = []
+    separators = dict()
+    while neighbors:
+        variable = min(neighbors, key=lambda v: len(neighbors[v]))
+        order.append(variable)
+
+        # Eliminating a variable connects all of its neighbors
+        adjacent = neighbors.pop(variable)
+        separators[variable] = set(adjacent)
+        for other in adjacent:
+            neighbors[other] |= adjacent
+            neighbors[other].discard(other)
+            neighbors[other].discard(variable)
+    return order, separators
+
+
+def multiply(factors):
+    """
+    Returns the product of `factors` over the union of their variables.
+    """
+    variables = []
+    for factor_variables, table in factors:
+        for variable in factor_variables:
+            if variable not in variables:
+                variables.append(variable)
+    positions = [
+        [variables.index(variable) for variable in factor_variables]
+        for factor_variables, table in factors
+    ]
+
+    product = dict()
+    for genes in itertools.product(GENES, repeat=len(variables)):
+        p = 1
+        for (factor_variables, table), indices in zip(factors, positions):
+            p *= table[tuple(genes[i] for i in indices)]
+        product[genes] = p
+    return tuple(variables), product
+
+
+def marginalize(factor, variables):
+    """
+    Returns `factor` with every variable not in `variables` summed out.
+    """
+    for variable in factor[0]:
+        if variable not in variables:
+            factor = sum_out(factor, variable)
+    return factor
+
+
+def normalized(factor):
+    """
+    Returns `factor` scaled to sum to 1, so that long chains of
+    messages do not underflow.
+    """
+    variables, table = factor
+    total = sum(table.values())
+    if not total:
+        return factor
+    return variables, {genes: p / total for genes, p in table.items()}
+
+
+def sum_out(factor, variable):
+    """
+    Returns `factor` with `variable` summed out.
+    """
+    variables, table = factor
+    index = variables.index(variable)
+    summed = dict()
+    for genes, p in table.items():
+        key = genes[:index] + genes[index + 1:]
+        summed[key] = summed.get(key, 0) + p
+    return variables[:index] + variables[index + 1:], summed
+
+
+def likelihood_weighting(people, error=0.005, seconds=10, seed=0,
+                         batch=10000, diagnostics=None):
+    """
+    Returns estimates of each person's gene and trait distributions by
+    likelihood weighting: gene counts are sampled from parents to
+    children, and each sample is weighted by the probability of the
+    known traits given its gene counts.
+
+    Batches of samples are drawn until the largest standard error of a
+    gene probability, based on the effective sample size of the
+    weights, is at most `error`, or until `seconds` have passed.
+    With many known traits a few samples carry all the weight, and
+    `gibbs` converges much faster: if the error target is not met in
+    time, a RuntimeWarning is issued and the estimates come from `gibbs`
+    instead, with a budget of another `seconds`.
+    If a `diagnostics` dict is given, it is filled with the number of
+    samples, the effective sample size, the largest standard error,
+    whether the target was met and the time taken, and with those of
+    the Gibbs sampler under "gibbs" after a fallback.
+    """
+    pedigree = pedigree_arrays(people)
+    tables = conditional_tables()
+    gene, inherit = tables["gene"], tables["inheritance"]
+    traits = pedigree["traits"]
+    known = np.flatnonzero(traits >= 0)
+    rng = np.random.default_rng(seed)
+    n = len(traits)
+    people_index = np.arange(n)
+
+    gene_sums = np.zeros((n, 3))
+    weight_sum = 0
+    square_sum = 0
+    offset = -np.inf
+    samples = 0
+    start = time.perf_counter()
+    while True:
+        genes = sample_forward(pedigree, gene, inherit, batch, rng)
+        log_w = pedigree["log_trait"][genes[:, known], traits[known]].sum(
+            axis=1
+        )
+
+        # Weights are kept relative to the largest log weight seen
+        top = log_w.max()
+        if top > offset:
+            scale = np.exp(offset - top)
+            gene_sums *= scale
+            weight_sum *= scale
+            square_sum *= scale ** 2
+            offset = top
+        w = np.exp(log_w - offset)
+        gene_sums += np.bincount(
+            (3 * people_index + genes).ravel(),
+            weights=np.broadcast_to(w[:, None], genes.shape).ravel(),
+            minlength=3 * n
+        ).reshape(n, 3)
+        weight_sum += w.sum()
+        square_sum += (w ** 2).sum()
+        samples += batch
+
+        # Standard error of a weighted mean of indicators
+        ess = weight_sum ** 2 / square_sum if square_sum else 0
+        estimates = gene_sums / weight_sum if weight_sum else gene_sums
+        standard_error = (
+            np.sqrt((estimates * (1 - estimates)).max() / ess)
+            if ess >= MIN_EFFECTIVE_SAMPLES else np.inf
+        )
+        elapsed = time.perf_counter() - start
+        if standard_error <= error or elapsed >= seconds:
+            break
+
+    converged = bool(standard_error <= error)
+    if diagnostics is not None:
+        diagnostics.update({
+            "samples": samples,
+            "effective_samples": float(ess),
+            "standard_error": float(standard_error),
+            "converged": converged,
+            "seconds": elapsed
+        })
+    if not converged:
+        warnings.warn(
+            f"likelihood weighting reached a standard error of "
+            f"{standard_error:.3g} with {ess:.0f} effective samples in "
+            f"{seconds} s, not {error}; falling back to Gibbs sampling",
+            RuntimeWarning, stacklevel=2
+        )
+        fallback = dict()
+        probabilities = gibbs(people, error=error, seconds=seconds,
+                              seed=seed, diagnostics=fallback)
+        if diagnostics is not None:
+            diagnostics["gibbs"] = fallback
+        return probabilities
+    probabilities = marginals(people, estimates, np.ones((n, 2)))
+    trait_marginals(people, probabilities)
+    return probabilities
+
+
+def gibbs(people, error=0.005, seconds=10, seed=0, chains=32,
+          diagnostics=None):
+    """
+    Returns estimates of each person's gene and trait distributions by
+    Gibbs sampling: each person's gene count is redrawn in turn given
+    their parents', their children's and the other parents' gene counts
+    and their known trait, in many independent chains at once.
+
+    After BURN_IN sweeps, sweeps are counted until every gene
+    probability has a potential scale reduction (R-hat) across chains
+    below 1.01 and a standard error, from the spread of the chains'
+    estimates, of at most `error`, or until `seconds` have passed.
+    If the targets are not met in time, a RuntimeWarning is issued.
+    If a `diagnostics` dict is given, it is filled with the number of
+    sweeps, the largest R-hat and standard error, whether the targets
+    were met and the time taken.
+    """
+    pedigree = pedigree_arrays(people)
+    tables = conditional_tables()
+    gene, inherit = tables["gene"], tables["inheritance"]
+    log_gene = pedigree["log_gene"]
+    log_inheritance = pedigree["log_inheritance"]
+    log_trait = pedigree["log_trait"]
+    mothers = pedigree["mothers"]
+    fathers = pedigree["fathers"]
+    traits = pedigree["traits"]
+    rng = np.random.default_rng(seed)
+    n = len(traits)
+
+    # Children of each person, with the index of the other parent
+    children = [[] for i in range(n)]
+    for child in range(n):
+        if mothers[child] >= 0:
+            children[mothers[child]].append((child, fathers[child], True))
+            children[fathers[child]].append((child, mothers[child], False))
+
+    genes = sample_forward(pedigree, gene, inherit, chains, rng)
+    counts = np.zeros((chains, n, 3))
+    chain_index = np.arange(chains)[:, None]
+    people_index = np.arange(n)
+    counted = 0
+    start = time.perf_counter()
+    for sweep in itertools.count():
+
+        # Redraw each person's gene count given all the others
+        for i in range(n):
+            if mothers[i] < 0:
+                log_p = np.broadcast_to(log_gene, (chains, 3)).copy()
+            else:
+                log_p = log_inheritance[
+                    :, genes[:, mothers[i]], genes[:, fathers[i]]
+                ].T.copy()
+            if traits[i] >= 0:
+                log_p += log_trait[:, traits[i]]
+            for child, other, is_mother in children[i]:
+                if is_mother:
+                    log_p += log_inheritance[genes[:, child], :,
+                                             genes[:, other]]
+                else:
+                    log_p += log_inheritance[genes[:, child],
+                                             genes[:, other], :]
+            genes[:, i] = sample_rows(
+                np.exp(log_p - log_p.max(axis=1, keepdims=True)), rng
+            )
+        if sweep < BURN_IN:
+            continue
+        counts[chain_index, people_index, genes] += 1
+        counted += 1
+        if counted % CHECK_SWEEPS:
+            continue
+
+        # Compare the variance within and between chains
+        means = counts / counted
+        estimates = means.mean(axis=0)
+        between = means.var(axis=0, ddof=1)
+        within = (counted / (counted - 1) * means * (1 - means)).mean(axis=0)
+        pooled = (counted - 1) / counted * within + between
+        mixing = within > 0
+        r_hat = np.sqrt(pooled[mixing] / within[mixing]).max(initial=1.0)
+        standard_error = np.sqrt(between.max() / chains)
+        elapsed = time.perf_counter() - start
+        converged = bool(r_hat < 1.01 and standard_error <= error)
+        if converged or elapsed >= seconds:
+            break
+
+    if diagnostics is not None:
+        diagnostics.update({
+            "sweeps": counted,
+            "chains": chains,
+            "r_hat": float(r_hat),
+            "standard_error": float(standard_error),
+            "converged": converged,
+            "seconds": elapsed
+        })
+    if not converged:
+        warnings.warn(
+            f"Gibbs sampling did not converge in {seconds} s: R-hat "
+            f"{r_hat:.4f}, standard error {standard_error:.3g}, "
+            f"target {error}",
+            RuntimeWarning, stacklevel=2
+        )
+    probabilities = marginals(people, estimates, np.ones((n, 2)))
+    trait_marginals(people, probabilities)
+    return probabilities
+
+
+def topological_order(mothers, fathers):
+    """
+    Returns the indices of people ordered so that parents come before
+    their children.
+    """
+    order = []
+    placed = np.zeros(len(mothers), dtype=bool)
+    while len(order) < len(mothers):
+        for i in np.flatnonzero(~placed):
+            if mothers[i] < 0 or (placed[mothers[i]] and placed[fathers[i]]):
+                order.append(i)
+                placed[i] = True
+    return order
+
+
+def sample_forward(pedigree, gene, inherit, size, rng):
+    """
+    Returns `size` samples of everyone's gene count, drawing founders
+    from `gene` and children from `inherit` given their parents.
+    """
+    mothers = pedigree["mothers"]
+    fathers = pedigree["fathers"]
+    genes = np.empty((size, len(mothers)), dtype=np.intp)
+    for i in pedigree["order"]:
+        if mothers[i] < 0:
+            p = np.broadcast_to(gene, (size, 3))
+        else:
+            p = inherit[:, genes[:, mothers[i]], genes[:, fathers[i]]].T
+        genes[:, i] = sample_rows(p, rng)
+    return genes
+
+
+def sample_rows(p, rng):
+    """
+    Returns one index drawn from each row of the unnormalized
+    probabilities `p`.
+    """
+    cumulative = p.cumsum(axis=1)
+    u = rng.random((len(p), 1)) * cumulative[:, -1:]
+    return (cumulative[:, :-1] <= u).sum(axis=1)
 
 
 def load_data(filename):
@@ -119,46 +786,39 @@ def load_data(filename):
 
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Yield all possible subsets of set s, one at a time.
     """
     s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    for subset in itertools.chain.from_iterable(
+        itertools.combinations(s, r) for r in range(len(s) + 1)
+    ):
+        yield set(subset)
 
 
-def p_from_parent(name, zero_gene, one_gene, two_genes):
-    #   Function that returns possibility that parent will pass the gene to child
-    if name in zero_gene:
-        return PROBS["mutation"]
+def gene_count(name, one_gene, two_genes):
+    #   Function that returns how many copies of the gene a person has
+    if name in two_genes:
+        return 2
     elif name in one_gene:
-        return 0.5
-    elif name in two_genes:
-        return 1 - PROBS["mutation"]
+        return 1
+    return 0
 
 
 def p_calculation(p, genes, nr, people, zero_gene, one_gene, two_genes, have_trait):
 
+    tables = conditional_tables()
     for person in genes:
 
         if people[person]["mother"] is None and people[person]["father"] is None:
-            p *= PROBS["gene"][nr]
+            p *= tables["gene"][nr]
         else:
-            p_from_mother = p_from_parent(people[person]["mother"], zero_gene, one_gene, two_genes)
-            p_from_father = p_from_parent(people[person]["father"], zero_gene, one_gene, two_genes)
+            mother = gene_count(people[person]["mother"], one_gene, two_genes)
+            father = gene_count(people[person]["father"], one_gene, two_genes)
+            p *= tables["inheritance"][nr, mother, father]
 
-            if nr == 0:
-                p *= (1 - p_from_mother) * (1 - p_from_father)
-            elif nr == 1:
-                p *= (p_from_mother * (1 - p_from_father)) + ((1 - p_from_mother) * p_from_father)
-            elif nr == 2:
-                p *= p_from_mother * p_from_father
+        p *= tables["trait"][nr, int(person in have_trait)]
 
-        p *= PROBS["trait"][nr][person in have_trait]
-
-    return p
+    return float(p)
 
 
 def joint_probability(people, one_gene, two_genes, have_trait):
@@ -223,6 +883,15 @@ def normalize(probabilities):
             probabilities[person]["trait"][False] /= trait_sum
 
 
+# Inference methods selectable from the command line, by name
+METHODS = {
+    "elimination": elimination,
+    "enumeration": enumeration,
+    "parallel": parallel_enumeration,
+    "likelihood": likelihood_weighting,
+    "gibbs": gibbs
+}
+
 
 if __name__ == "__main__":
     main()